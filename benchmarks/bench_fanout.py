@@ -0,0 +1,124 @@
+"""Latency and throughput of endpoints with independent upstream calls, run
+one after another versus fanned out on the worker pool, under concurrent load.
+
+The token secret is left unset so /api/validate_token has to ask the auth
+service, as it does for tokens that cannot be verified locally.
+
+    python -m benchmarks.bench_fanout
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["SUPABASE_JWT_SECRET"] = ""
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark-anon")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark-service")
+# Every client thread shares one address; limits would cap the measurement
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import jwt
+
+from benchmarks.fake_supabase import FakeSupabase
+from utils import concurrency
+from utils.profile_stats import set_profile_cache_backend
+from utils.supabase_clients import set_client
+from main import app
+
+LATENCY = float(os.getenv("BENCH_LATENCY", "0.02"))
+CLIENTS = int(os.getenv("BENCH_CLIENTS", "8"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+USERS = 200
+
+
+class NoCache:
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def make_token(user_id):
+    # A fresh jti per token keeps the verifier's token cache from answering
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600, "jti": uuid.uuid4().hex},
+        "unverified",
+        algorithm="HS256",
+    )
+
+
+def load_dataset(supabase):
+    users = [
+        {"id": str(uuid.uuid4()), "name": f"User {i}", "username": f"user{i}", "email": f"user{i}@example.com"}
+        for i in range(USERS)
+    ]
+    supabase.tables = {
+        "User": users,
+        "recipe": [{"id": i, "created_by": users[i % USERS]["id"]} for i in range(1, 1001)],
+        "savedrecipe": [{"id": i, "user_id": users[i % USERS]["id"], "recipe_id": i} for i in range(1, 1001)],
+    }
+    return [user["id"] for user in users]
+
+
+def scenarios(user_ids):
+    profile_headers = {"Authorization": f"Bearer {make_token(user_ids[0])}"}
+
+    def validate_token(client, i):
+        headers = {"Authorization": f"Bearer {make_token(user_ids[i % USERS])}"}
+        return client.get("/api/validate_token", headers=headers)
+
+    def profile(client, i):
+        return client.get("/api/profile", headers=profile_headers)
+
+    def signup(client, i):
+        name = uuid.uuid4().hex[:12]
+        return client.post("/api/signup", json={
+            "name": name, "username": name, "email": f"{name}@example.com", "password": "benchmark",
+        })
+
+    return [("validate_token", validate_token), ("profile", profile), ("signup", signup)]
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run_load(send):
+    def timed(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = send(client, i)
+        assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        latencies = sorted(pool.map(timed, range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    return percentile(latencies, 50), percentile(latencies, 95), REQUESTS / elapsed
+
+
+def main():
+    supabase = FakeSupabase(latency=LATENCY)
+    set_client("anon", supabase)
+    set_profile_cache_backend(NoCache())
+    user_ids = load_dataset(supabase)
+    fanout_executor = concurrency._executor
+
+    print(f"per-call latency: {LATENCY * 1000:.1f} ms, {CLIENTS} concurrent clients, {REQUESTS} requests per run")
+    print(f"{'endpoint':<15} {'mode':<10} | {'p50 ms':>7} {'p95 ms':>7} {'req/s':>7}")
+    for name, send in scenarios(user_ids):
+        for mode, executor in (("sequential", None), ("fan-out", fanout_executor)):
+            concurrency._executor = executor
+            p50, p95, throughput = run_load(send)
+            print(f"{name:<15} {mode:<10} | {p50 * 1000:>7.1f} {p95 * 1000:>7.1f} {throughput:>7.1f}")
+    concurrency._executor = fanout_executor
+
+
+if __name__ == "__main__":
+    main()
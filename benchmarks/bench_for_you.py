@@ -0,0 +1,78 @@
+"""Batch time, memory and request latency of the personalised "for you" feeds.
+
+Scores BENCH_USERS users against BENCH_RECIPES recipes the way the batch job
+does, in chunks of 200 users, then measures what the cached feeds hold and
+what a request costs when its feed is cached and when it has to be computed
+on demand (after a save invalidated it).
+
+    python -m benchmarks.bench_for_you
+    BENCH_RECIPES=100000 BENCH_USERS=10000 python -m benchmarks.bench_for_you
+"""
+import os
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_search import build_vocabulary, fake_recipe, report
+from utils.cache import TTLCache
+from utils.for_you import FOR_YOU_MAX_SAVES, popularity, rank
+from utils.similar_recipes import SimilarityIndex
+from utils.trending import TrendingScores
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "20000"))
+USERS = int(os.getenv("BENCH_USERS", "10000"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "1000"))
+
+
+def timed(call, *args):
+    started = time.perf_counter()
+    call(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    rng = random.Random(42)
+    vocabulary, weights = build_vocabulary(rng)
+    recipes = [fake_recipe(recipe_id, rng, vocabulary, weights) for recipe_id in range(1, RECIPES + 1)]
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    index.build(recipes)
+    print(f"similarity index: {RECIPES} recipes in {time.perf_counter() - started:.1f} s")
+
+    scores = TrendingScores()
+    now = time.time()
+    for _ in range(RECIPES * 5):
+        scores.record(rng.randint(1, RECIPES), "save", now - rng.random() * 14 * 86400)
+    boost = popularity(index, scores)
+
+    saved_by_user = {
+        user_id: rng.sample(range(1, RECIPES + 1), min(FOR_YOU_MAX_SAVES, int(rng.paretovariate(1.0)) - 1))
+        for user_id in range(1, USERS + 1)
+    }
+    cold = sum(1 for saved in saved_by_user.values() if not saved)
+
+    tracemalloc.start()
+    feeds = TTLCache(maxsize=USERS, ttl=3600)
+    started = time.perf_counter()
+    users = list(saved_by_user)
+    for start in range(0, len(users), 200):
+        chunk = {user_id: saved_by_user[user_id] for user_id in users[start:start + 200]}
+        for user_id, feed in rank(index, chunk, boost).items():
+            feeds.set(user_id, feed)
+    elapsed = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"batch: {USERS} users ({cold} with no saves) in {elapsed:.2f} s, "
+          f"{elapsed / USERS * 1000:.3f} ms per user")
+    print(f"cached feeds: {held / 2 ** 20:.1f} MiB, {held / 2 ** 20 * 10000 / USERS:.1f} MiB per 10k users")
+
+    lookups = [rng.randint(1, USERS) for _ in range(QUERIES)]
+    report("feed (cached)", [timed(feeds.get, user_id) for user_id in lookups])
+    report("feed (on demand)", [
+        timed(rank, index, {user_id: saved_by_user[user_id]}, popularity(index, scores))
+        for user_id in lookups[:200]
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Payload size and encoding cost of the nested versus the normalized response shape.
+
+Requests the recipe list, search and saved-recipes endpoints with and
+without `shape=normalized`, uncompressed and with gzip and brotli, and times
+serialising the same payloads with Flask's default JSON provider and with
+orjson.
+
+    python -m benchmarks.bench_payload
+"""
+import os
+import time
+
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-secret")
+
+import jwt
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.bench_search import report
+from benchmarks.dataset import build_tables
+from benchmarks.fake_supabase import FakeSupabase
+from routes.recipe_routes import recipe_bp
+from utils.compression import init_compression
+from utils.json_provider import OrjsonProvider
+from utils.supabase_clients import set_client
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "2000"))
+# Few users relative to comments, so the same commenters recur across a page
+USERS = int(os.getenv("BENCH_USERS", "100"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200"))
+
+
+def timed(call, *args):
+    started = time.perf_counter()
+    call(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    tables = build_tables(recipes=RECIPES, users=USERS, comments_per_recipe=8, saves_per_user=100)
+    set_client("anon", FakeSupabase(tables))
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(recipe_bp)
+    init_compression(app)
+    client = app.test_client()
+
+    user_id = tables["User"][0]["id"]
+    token = jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+        algorithm="HS256",
+    )
+    auth = {"Authorization": f"Bearer {token}"}
+    word = tables["recipe"][0]["title"].split()[0]
+    endpoints = {
+        "get_all_recipe": ("/api/get_all_recipe?limit=50&include=comments", {}),
+        "search_recipe": (f"/api/search_recipe?query={word}&limit=50", auth),
+        "get_save_recipe": ("/api/get_save_recipe?", auth),
+    }
+
+    print(f"{'':<34}{'identity':>10}{'gzip':>10}{'br':>10}")
+    payloads = {}
+    for name, (url, headers) in endpoints.items():
+        for shape in ("nested", "normalized"):
+            path = url + ("&shape=normalized" if shape == "normalized" else "")
+            sizes = []
+            for encoding in ("identity", "gzip", "br"):
+                response = client.get(path, headers={**headers, "Accept-Encoding": encoding})
+                assert response.status_code == 200, (path, response.status_code)
+                sizes.append(len(response.data))
+                if encoding == "identity":
+                    payloads[f"{name} ({shape})"] = response.get_json()
+            print(f"{name + ' (' + shape + ')':<34}" + "".join(f"{size / 1024:>8.1f}KB" for size in sizes))
+
+    print()
+    default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+    for name in ("get_save_recipe (nested)", "get_save_recipe (normalized)"):
+        payload = payloads[name]
+        report(f"json {name.split()[1]}", [timed(default.dumps, payload) for _ in range(ROUNDS)])
+        report(f"orjson {name.split()[1]}", [timed(fast.dumps, payload) for _ in range(ROUNDS)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Upstream call count and latency of /api/get_save_recipe versus saved-list size.
+
+Compares the previous one-query-per-recipe loop with the batched endpoint,
+both against the in-memory fake client with a fixed per-call latency.
+
+    python -m benchmarks.bench_saved_recipes
+"""
+import os
+import time
+
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-secret")
+
+import jwt
+from flask import Flask
+
+from benchmarks.fake_supabase import FakeSupabase
+from routes.recipe_routes import recipe_bp
+from utils.supabase_clients import set_client
+
+LATENCY = float(os.getenv("BENCH_LATENCY", "0.005"))
+SIZES = [1, 10, 50, 200, 500]
+USER_ID = "bench-user"
+
+
+def legacy_fetch(supabase, user_id):
+    saved_entries = supabase.table("savedrecipe").select("recipe_id").eq("user_id", user_id).execute()
+    all_recipes = []
+    for entry in saved_entries.data:
+        recipe = supabase.table("recipe").select("*").eq("id", entry["recipe_id"]).limit(1).execute()
+        if recipe.data:
+            all_recipes.append(recipe.data[0])
+    return all_recipes
+
+
+def load_dataset(supabase, size):
+    supabase.tables = {
+        "recipe": [{"id": i, "title": f"Recipe {i}", "created_by": "author"} for i in range(1, size + 1)],
+        # saved newest-recipe-first so ordering has to be restored explicitly
+        "savedrecipe": [
+            {"id": n, "user_id": USER_ID, "recipe_id": recipe_id}
+            for n, recipe_id in enumerate(range(size, 0, -1), start=1)
+        ],
+    }
+
+
+def main():
+    supabase = FakeSupabase(latency=LATENCY)
+    app = Flask(__name__)
+    set_client("anon", supabase)
+    app.register_blueprint(recipe_bp)
+    client = app.test_client()
+
+    token = jwt.encode(
+        {"sub": USER_ID, "aud": "authenticated", "exp": int(time.time()) + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+        algorithm="HS256",
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"per-call latency: {LATENCY * 1000:.1f} ms")
+    print(f"{'saved':>6} | {'legacy calls':>12} {'legacy ms':>10} | {'batched calls':>13} {'batched ms':>10}")
+    for size in SIZES:
+        load_dataset(supabase, size)
+
+        supabase.reset_counters()
+        started = time.perf_counter()
+        expected = [recipe["id"] for recipe in legacy_fetch(supabase, USER_ID)]
+        legacy_ms = (time.perf_counter() - started) * 1000
+        legacy_calls = supabase.calls
+
+        supabase.reset_counters()
+        started = time.perf_counter()
+        response = client.get("/api/get_save_recipe", headers=headers)
+        batched_ms = (time.perf_counter() - started) * 1000
+        batched_calls = supabase.calls
+
+        got = [recipe["id"] for recipe in response.get_json()["recipes"]]
+        assert got == expected, "batched endpoint changed the saved-recipe order"
+
+        print(f"{size:>6} | {legacy_calls:>12} {legacy_ms:>10.1f} | {batched_calls:>13} {batched_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
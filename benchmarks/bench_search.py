@@ -0,0 +1,107 @@
+"""Build time and query latency of the in-process search index on a synthetic corpus.
+
+For comparison, also times a substring scan over titles, which is what the old
+`ilike '%query%'` search made Postgres do on every request.
+
+    python -m benchmarks.bench_search
+    BENCH_RECIPES=20000 python -m benchmarks.bench_search
+"""
+import os
+import random
+import statistics
+import time
+
+from utils.search_index import SearchIndex
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "100000"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "500"))
+VOCABULARY = int(os.getenv("BENCH_VOCABULARY", "5000"))
+
+WORDS = """
+chicken beef pork lamb tofu tempeh salmon tuna shrimp cod egg lentil chickpea bean
+rice quinoa pasta noodle bread tortilla potato sweet corn barley oat couscous
+tomato onion garlic ginger carrot celery pepper chili spinach kale cabbage broccoli
+cauliflower zucchini eggplant mushroom pea leek pumpkin squash avocado cucumber
+lemon lime orange apple banana mango pineapple berry strawberry coconut date fig
+basil cilantro parsley mint thyme rosemary oregano cumin turmeric paprika cinnamon
+curry masala pesto salsa soup stew salad bowl wrap burger taco pie cake cookie
+roast grilled baked fried steamed spicy creamy crispy smoky tangy sweet sour quick
+easy healthy vegan vegetarian classic homemade rustic summer winter weekday family
+butter cream cheese yogurt milk honey maple soy sesame peanut almond cashew walnut
+""".split()
+
+
+def build_vocabulary(rng):
+    # Real recipe text is Zipf-distributed: a few very common words and a long
+    # tail of rare ones. Pad the food words with made-up tail terms.
+    syllables = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "da", "pe", "zo", "chu"]
+    tail = {"".join(rng.choices(syllables, k=3)) for _ in range(VOCABULARY * 2)}
+    vocabulary = WORDS + sorted(tail)[: max(0, VOCABULARY - len(WORDS))]
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(vocabulary))]
+    return vocabulary, weights
+
+
+def fake_recipe(recipe_id, rng, vocabulary, weights):
+    def words(low, high):
+        return rng.choices(vocabulary, weights, k=rng.randint(low, high))
+
+    return {
+        "id": recipe_id,
+        "title": " ".join(words(2, 5)),
+        "ingredients": ", ".join(words(5, 12)),
+        "description": " ".join(words(8, 20)),
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples):
+    samples = [sample * 1000 for sample in samples]
+    print(
+        f"{name:<22} p50 {percentile(samples, 50):8.3f} ms  p95 {percentile(samples, 95):8.3f} ms  "
+        f"p99 {percentile(samples, 99):8.3f} ms  mean {statistics.mean(samples):8.3f} ms"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    vocabulary, weights = build_vocabulary(rng)
+    recipes = [fake_recipe(recipe_id, rng, vocabulary, weights) for recipe_id in range(1, RECIPES + 1)]
+    queries = [" ".join(rng.choices(vocabulary, k=rng.randint(1, 3))) for _ in range(QUERIES)]
+    # Partial last words exercise prefix expansion
+    queries += [query[:-2] for query in queries[: QUERIES // 5]]
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for recipe in recipes:
+        index.add(recipe)
+    print(f"indexed {RECIPES} recipes in {time.perf_counter() - started:.2f} s, {len(index.postings)} terms")
+
+    indexed = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, 0, 20)
+        indexed.append(time.perf_counter() - started)
+
+    scanned = []
+    for query in queries[:50]:
+        started = time.perf_counter()
+        needle = query.lower()
+        [recipe["id"] for recipe in recipes if needle in recipe["title"].lower()][:20]
+        scanned.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for recipe_id in range(1, 1001):
+        index.add(fake_recipe(recipe_id, rng, vocabulary, weights))
+    update_ms = (time.perf_counter() - started) * 1000 / 1000
+
+    report("indexed search (top 20)", indexed)
+    report("title substring scan", scanned)
+    print(f"incremental update       {update_ms:.3f} ms per recipe")
+
+
+if __name__ == "__main__":
+    main()
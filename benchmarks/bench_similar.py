@@ -0,0 +1,107 @@
+"""Build time, memory, lookup latency and write cost of the similar-recipes index.
+
+For comparison, also times answering a lookup on demand with one
+matrix-vector product over all recipes, which is what serving without the
+precomputed neighbour table would cost per request, and measures recall@10
+against exact cosine similarity of the sparse TF-IDF vectors.
+
+    python -m benchmarks.bench_similar
+    BENCH_RECIPES=20000 python -m benchmarks.bench_similar
+"""
+import math
+import os
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks.bench_search import build_vocabulary, fake_recipe, report
+from utils.similar_recipes import SimilarityIndex
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "100000"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "10000"))
+WRITES = int(os.getenv("BENCH_WRITES", "200"))
+RECALL_QUERIES = int(os.getenv("BENCH_RECALL_QUERIES", "200"))
+
+
+def timed(call, *args):
+    started = time.perf_counter()
+    call(*args)
+    return time.perf_counter() - started
+
+
+def exact_neighbors(index, recipes, recipe_ids, k=10):
+    """Top `k` recipes by exact cosine of the TF-IDF vectors the index approximates."""
+    vectors = {}
+    postings = defaultdict(list)
+    for recipe in recipes:
+        weights = {
+            term: (1 + math.log(frequency)) * index.idf.get(term, index.default_idf)
+            for term, frequency in index._frequencies(recipe).items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        vectors[recipe["id"]] = {term: weight / norm for term, weight in weights.items()}
+        for term, weight in vectors[recipe["id"]].items():
+            postings[term].append((recipe["id"], weight))
+
+    neighbors = {}
+    for recipe_id in recipe_ids:
+        scores = defaultdict(float)
+        for term, weight in vectors[recipe_id].items():
+            for other, other_weight in postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(recipe_id, None)
+        neighbors[recipe_id] = sorted(scores, key=scores.get, reverse=True)[:k]
+    return neighbors
+
+
+def recall(index, recipes, recipe_ids, k=10):
+    exact = exact_neighbors(index, recipes, recipe_ids, k)
+    found = [
+        len(set(exact[recipe_id]) & {other for other, _ in index.similar(recipe_id, k, min_score=-1.0)}) / len(exact[recipe_id])
+        for recipe_id in recipe_ids if exact[recipe_id]
+    ]
+    return sum(found) / len(found)
+
+
+def main():
+    rng = random.Random(42)
+    vocabulary, weights = build_vocabulary(rng)
+    recipes = [fake_recipe(recipe_id, rng, vocabulary, weights) for recipe_id in range(1, RECIPES + 1)]
+
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    index.build(recipes)
+    elapsed = time.perf_counter() - started
+    print(f"build: {RECIPES} recipes in {elapsed:.1f} s, "
+          f"{index.nbytes() / 2 ** 20:.1f} MiB ({index.dimensions} dimensions, {index.k} neighbours)")
+
+    sample = rng.sample(range(1, RECIPES + 1), min(RECALL_QUERIES, RECIPES))
+    print(f"recall@10 vs exact TF-IDF cosine: {recall(index, recipes, sample):.3f} ({len(sample)} recipes)")
+
+    lookups = [rng.randint(1, RECIPES) for _ in range(QUERIES)]
+    report("similar (precomputed)", [timed(index.similar, recipe_id, 10) for recipe_id in lookups])
+
+    def on_demand(recipe_id):
+        similarity = index.vectors[:RECIPES] @ index.vectors[recipe_id - 1]
+        np.argpartition(similarity, -11)[-11:]
+
+    report("similar (on demand)", [timed(on_demand, recipe_id) for recipe_id in lookups[:200]])
+
+    added = [fake_recipe(RECIPES + i + 1, rng, vocabulary, weights) for i in range(WRITES)]
+    report("add", [timed(index.add, recipe) for recipe in added])
+    edited = [fake_recipe(rng.randint(1, RECIPES), rng, vocabulary, weights) for _ in range(WRITES)]
+    report("update", [timed(index.add, recipe) for recipe in edited])
+    removed = rng.sample(range(1, RECIPES + 1), WRITES)
+    report("remove", [timed(index.remove, recipe_id) for recipe_id in removed])
+
+    sample = recipes[lookups[0] - 1]
+    print(f"\nexample: {sample['title']!r}")
+    titles = {recipe["id"]: recipe["title"] for recipe in recipes + added}
+    for recipe_id, score in index.similar(sample["id"], 5):
+        print(f"  {score:.3f}  {titles.get(recipe_id)!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Bytes a client downloads to catch up: the whole recipe list versus /api/sync.
+
+Pages through get_all_recipe as the mobile client did on every app open,
+then applies a number of recipe updates, comments and deletes and measures
+what a sync from the previous watermark transfers.
+
+    python -m benchmarks.bench_sync
+"""
+import os
+import random
+from datetime import datetime, timezone
+
+os.environ.setdefault("SYNC_SETTLE_SECONDS", "0")
+
+from flask import Flask
+
+from benchmarks.dataset import build_tables
+from benchmarks.fake_supabase import FakeSupabase
+from routes.recipe_routes import recipe_bp
+from routes.sync_routes import sync_bp
+from utils.json_provider import OrjsonProvider
+from utils.supabase_clients import set_client
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "5000"))
+CHANGES = [0, 10, 100, 1000]
+
+
+def download(client, first, follow):
+    """Follow a paginated endpoint to the end; returns (bytes, requests, final response)."""
+    total, requests, url = 0, 0, first
+    while True:
+        response = client.get(url)
+        total += len(response.data)
+        requests += 1
+        data = response.get_json()
+        url = follow(data)
+        if not url:
+            return total, requests, data
+
+
+def main():
+    rng = random.Random(42)
+    tables = build_tables(recipes=RECIPES)
+    supabase = FakeSupabase(tables)
+    set_client("anon", supabase)
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(recipe_bp)
+    app.register_blueprint(sync_bp)
+    client = app.test_client()
+
+    size, requests, _ = download(
+        client, "/api/get_all_recipe?limit=100",
+        lambda data: data["next_cursor"] and f"/api/get_all_recipe?limit=100&cursor={data['next_cursor']}",
+    )
+    print(f"full download: {RECIPES} recipes, {requests} requests, {size / 2 ** 20:.2f} MiB")
+
+    watermark = datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
+    _, _, data = download(client, f"/api/sync?since={watermark}", lambda data: None)
+    cursor = data["cursor"]
+
+    print(f"{'changes':>8}{'requests':>10}{'bytes':>12}  vs full download")
+    for changes in CHANGES:
+        recipes = supabase.tables["recipe"]
+        for _ in range(changes):
+            kind = rng.choices(("update", "comment", "delete"), (5, 4, 1))[0]
+            recipe = rng.choice(recipes)
+            if kind == "update":
+                supabase.table("recipe").update({"title": recipe["title"] + "!"}).eq("id", recipe["id"]).execute()
+            elif kind == "comment":
+                supabase.table("comment").insert({"recipe_id": recipe["id"], "user_id": recipe["created_by"], "comment": "Nice"}).execute()
+            else:
+                # The fake records the tombstone, like the trigger on the real table
+                supabase.table("recipe").delete().eq("id", recipe["id"]).execute()
+                recipes = supabase.tables["recipe"]
+
+        sync_size, requests, data = download(
+            client, f"/api/sync?cursor={cursor}",
+            lambda data: data["has_more"] and f"/api/sync?cursor={data['cursor']}",
+        )
+        cursor = data["cursor"]
+        print(f"{changes:>8}{requests:>10}{sync_size:>12}  {sync_size / size:.2%}")
+
+
+if __name__ == "__main__":
+    main()
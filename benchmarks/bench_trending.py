@@ -0,0 +1,76 @@
+"""Cost of recording events, reading the trending page and compacting the scores.
+
+Replays a skewed stream of saves, comments and unsaves over a month into
+TrendingScores, then times the feed read against ranking every recipe on
+demand, which is what serving without the maintained leader heap would cost.
+
+    python -m benchmarks.bench_trending
+    BENCH_RECIPES=20000 BENCH_EVENTS=200000 python -m benchmarks.bench_trending
+"""
+import heapq
+import os
+import random
+import time
+
+from benchmarks.bench_search import report
+from utils.trending import TrendingScores
+
+RECIPES = int(os.getenv("BENCH_RECIPES", "100000"))
+EVENTS = int(os.getenv("BENCH_EVENTS", "1000000"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "10000"))
+
+
+def timed(call, *args, **kwargs):
+    started = time.perf_counter()
+    call(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def main():
+    rng = random.Random(42)
+    now = time.time()
+    start = now - 30 * 86400
+    scores = TrendingScores()
+
+    events = []
+    for i in range(EVENTS):
+        # A long tail of recipes with the odd event, and a few popular ones with most of them
+        if rng.random() < 0.3:
+            recipe_id = rng.randint(1, RECIPES)
+        else:
+            recipe_id = (int(rng.paretovariate(1.2)) * 7919) % RECIPES + 1
+        kind = rng.choices(("save", "comment", "unsave"), (6, 3, 1))[0]
+        events.append((recipe_id, kind, start + (now - start) * i / EVENTS))
+
+    record_times = []
+    for recipe_id, kind, at in events:
+        if kind == "unsave":
+            record_times.append(timed(scores.record, recipe_id, "save", at, count=-1))
+        else:
+            record_times.append(timed(scores.record, recipe_id, kind, at))
+    report("record", record_times)
+    print(f"{len(scores.scores)} recipes scored, {len(scores._heap)} heap entries")
+
+    pages = [rng.randint(0, scores.size // 20 - 1) * 20 for _ in range(QUERIES)]
+    report("top (cached order)", [timed(scores.top, offset, 20) for offset in pages])
+
+    def cold(offset):
+        scores._ranked = None
+        scores.top(offset, 20)
+
+    report("top (after a write)", [timed(cold, offset) for offset in pages])
+    report("rank all on demand", [
+        timed(heapq.nlargest, offset + 20, scores.scores.items(), key=lambda item: item[1])
+        for offset in pages[:200]
+    ])
+
+    ranked_before = [recipe_id for recipe_id, _ in scores.top(0, scores.size)[0]]
+    report("compact", [timed(scores.compact)])
+    ranked_after = [recipe_id for recipe_id, _ in scores.top(0, scores.size)[0]]
+    same = sum(a == b for a, b in zip(ranked_before, ranked_after))
+    print(f"{len(scores.scores)} recipes left after compaction; "
+          f"{same}/{len(ranked_after)} ranks unchanged by the exact rebuild")
+
+
+if __name__ == "__main__":
+    main()
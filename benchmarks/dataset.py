@@ -0,0 +1,104 @@
+"""Synthetic Green Spoon tables for the load test and fake server.
+
+Recipe text reuses the Zipf-distributed vocabulary from bench_search, so
+search and ingredient queries hit realistic posting-list sizes.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_search import build_vocabulary, fake_recipe
+from utils.ingredient_index import normalize_ingredients
+
+ADMINS = 2
+
+
+def _timestamp(moment):
+    # One fixed format so timestamps compare correctly as strings, like keyset cursors do
+    return moment.isoformat(timespec="microseconds")
+
+
+def build_tables(recipes=5000, users=500, comments_per_recipe=4, saves_per_user=10, seed=42):
+    """Return {table: rows} with `recipes` recipes, `users` users (the first ADMINS are admins) and related rows."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    vocabulary, weights = build_vocabulary(rng)
+
+    user_rows = []
+    for i in range(users):
+        user_rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"User {i}",
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "is_admin": i < ADMINS,
+            "profile_picture_url": None,
+            "created_at": _timestamp(now - timedelta(days=365, seconds=i)),
+        })
+
+    recipe_rows = []
+    for recipe_id in range(1, recipes + 1):
+        recipe = fake_recipe(recipe_id, rng, vocabulary, weights)
+        recipe.update({
+            "created_by": rng.choice(user_rows)["id"],
+            "instructions": " ".join(rng.choices(vocabulary, weights, k=30)),
+            "ingredient_tags": normalize_ingredients(recipe["ingredients"]),
+            "recipe_image_url": None,
+            "is_ai_generated": rng.random() < 0.1,
+            "created_at": _timestamp(now - timedelta(seconds=rng.randint(0, 180 * 86400))),
+        })
+        recipe["updated_at"] = recipe["created_at"]
+        recipe_rows.append(recipe)
+
+    comment_rows = []
+    for recipe in recipe_rows:
+        posted = datetime.fromisoformat(recipe["created_at"])
+        # Skewed so a few recipes carry most of the discussion
+        for _ in range(int(rng.expovariate(1 / comments_per_recipe)) if comments_per_recipe else 0):
+            posted += timedelta(seconds=rng.randint(60, 86400))
+            comment_rows.append({
+                "id": len(comment_rows) + 1,
+                "user_id": rng.choice(user_rows)["id"],
+                "recipe_id": recipe["id"],
+                "comment": " ".join(rng.choices(vocabulary, weights, k=rng.randint(3, 15))),
+                "created_at": _timestamp(min(posted, now)),
+            })
+
+    saved_rows = []
+    for user in user_rows:
+        for recipe in rng.sample(recipe_rows, min(saves_per_user, len(recipe_rows))):
+            saved_rows.append({
+                "id": len(saved_rows) + 1,
+                "user_id": user["id"],
+                "recipe_id": recipe["id"],
+                "created_at": _timestamp(now),
+            })
+
+    report_rows = []
+    contact_rows = []
+    for i in range(max(1, recipes // 50)):
+        report_rows.append({
+            "id": i + 1,
+            "user_id": rng.choice(user_rows)["id"],
+            "recipe_id": rng.choice(recipe_rows)["id"],
+            "message": "spam",
+            "reported_at": _timestamp(now - timedelta(minutes=i)),
+        })
+        contact_rows.append({
+            "id": i + 1,
+            "user_id": rng.choice(user_rows)["id"],
+            "name": "Someone",
+            "email": "someone@example.com",
+            "phone": None,
+            "message": "Hello",
+            "created_at": _timestamp(now - timedelta(minutes=i)),
+        })
+
+    return {
+        "User": user_rows,
+        "recipe": recipe_rows,
+        "comment": comment_rows,
+        "savedrecipe": saved_rows,
+        "report": report_rows,
+        "contact_us": contact_rows,
+    }
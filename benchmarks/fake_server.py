@@ -0,0 +1,211 @@
+"""Local HTTP stand-in for Supabase (PostgREST and auth) and Cloudinary uploads.
+
+Serves the tables from benchmarks.dataset through benchmarks.fake_supabase,
+sleeping `--latency` seconds per call, so the real supabase-py and
+cloudinary clients can be pointed at it:
+
+    python -m benchmarks.fake_server --port 54321 --latency 0.02 --recipes 5000
+
+Prints "listening on <port>" once ready. GET /__stats returns call counts
+per table (auth calls under "auth", uploads under "cloudinary"); POST
+/__reset clears them.
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import jwt
+
+from benchmarks.dataset import build_tables
+from benchmarks.fake_supabase import FakeSupabase, parse_condition
+
+
+def build_query(store, table, params):
+    """Translate PostgREST query parameters into a FakeQuery."""
+    query = store.table(table)
+    for key, value in params:
+        if key == "select":
+            query.columns = value
+        elif key == "order" or key.endswith(".order"):
+            foreign_table = key[:-len(".order")] or None
+            for part in value.split(","):
+                column, direction = (part.split(".") + ["asc"])[:2]
+                query.order(column, desc=direction == "desc", foreign_table=foreign_table)
+        elif key == "limit" or key.endswith(".limit"):
+            query.limit(int(value), foreign_table=key[:-len(".limit")] or None)
+        elif key == "offset":
+            query.offset(int(value))
+        elif key in ("or", "and"):
+            query.filters.append(parse_condition(key + value))
+        elif key != "columns" and not key.endswith(".offset"):
+            operator, _, criteria = value.partition(".")
+            query.filter(key, operator, criteria)
+    return query
+
+
+def auth_user(user_id, email=None):
+    # The fields gotrue's User model requires
+    return {
+        "id": user_id,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": email,
+        "app_metadata": {},
+        "user_metadata": {},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so the app's pooled httpx clients reuse connections
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms to each call
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def reply(self, status, body=None, headers=None):
+        payload = b"" if body is None else json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def body(self):
+        return json.loads(self.raw_body) if self.raw_body else None
+
+    def handle_any(self):
+        # Always drain the body (supabase-py sends "{}" even on GETs) or it
+        # corrupts the next request on this keep-alive connection
+        self.raw_body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        try:
+            if parts[:2] == ["rest", "v1"] and len(parts) == 3:
+                return self.rest(parts[2], parse_qsl(url.query, keep_blank_values=True))
+            if parts[:2] == ["auth", "v1"]:
+                return self.auth(parts[2:])
+            if len(parts) == 5 and parts[0] == "v1_1" and parts[-1] == "upload":
+                return self.upload(parts[1])
+            if parts == ["__stats"]:
+                return self.reply(200, {"calls": self.store.calls, "calls_by_table": self.store.calls_by_table})
+            if parts == ["__reset"]:
+                self.store.reset_counters()
+                return self.reply(200, {})
+        except Exception as e:
+            return self.reply(400, {"message": str(e), "code": "FAKE", "details": None, "hint": None})
+        self.reply(404, {"message": f"No route for {url.path}", "code": "FAKE", "details": None, "hint": None})
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_PUT = do_DELETE = handle_any
+
+    def rest(self, table, params):
+        query = build_query(self.store, table, params)
+        if self.command in ("GET", "HEAD"):
+            prefer = self.headers.get("Prefer") or ""
+            query.count = "exact" if "count=" in prefer else None
+            query.head = self.command == "HEAD"
+        elif self.command == "POST":
+            query.insert(self.body())
+        elif self.command == "PATCH":
+            query.update(self.body())
+        elif self.command == "DELETE":
+            query.delete()
+
+        result = query.execute()
+        headers = {}
+        if result.count is not None:
+            first = query.row_offset
+            span = f"{first}-{first + len(result.data) - 1}" if result.data else "*"
+            headers["Content-Range"] = f"{span}/{result.count}"
+        self.reply(201 if self.command == "POST" else 200, result.data, headers)
+
+    def auth(self, path):
+        if path == ["user"]:
+            self.store.record("auth")
+            token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+            claims = jwt.decode(token, options={"verify_signature": False})
+            return self.reply(200, auth_user(claims["sub"], claims.get("email")))
+
+        if path == ["signup"]:
+            self.store.record("auth")
+            # Email confirmation on: a user and no session, so the shared client stays anonymous
+            return self.reply(200, auth_user(str(uuid.uuid4()), (self.body() or {}).get("email")))
+
+        if path == ["token"]:
+            self.store.record("auth")
+            email = (self.body() or {}).get("email")
+            users = self.store.index("User", "email").get(str(email))
+            if not users:
+                return self.reply(400, {"error": "invalid_grant", "error_description": "Invalid login credentials"})
+            user_id = users[0]["id"]
+            token = jwt.encode({"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600},
+                               self.server.jwt_secret or "fake")
+            return self.reply(200, {
+                "access_token": token,
+                "refresh_token": uuid.uuid4().hex,
+                "expires_in": 3600,
+                "token_type": "bearer",
+                "user": auth_user(user_id, email),
+            })
+
+        if path[:2] == ["admin", "users"] and len(path) == 3:
+            self.store.record("auth")
+            return self.reply(200, auth_user(path[2]))
+
+        if path == ["recover"]:
+            self.store.record("auth")
+            return self.reply(200, {})
+
+        self.reply(404, {"message": "Unknown auth endpoint"})
+
+    def upload(self, cloud_name):
+        self.store.record("cloudinary")
+        public_id = uuid.uuid4().hex
+        self.reply(200, {
+            "public_id": public_id,
+            "secure_url": f"https://res.cloudinary.com/{cloud_name}/image/upload/{public_id}.webp",
+        })
+
+
+def serve(port=0, latency=0.0, recipes=5000, users=500, comments=4, jwt_secret=None):
+    """Build the server over a fresh dataset; call serve_forever() on it to start serving."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.store = FakeSupabase(build_tables(recipes, users, comments), latency=latency)
+    server.jwt_secret = jwt_secret
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every call")
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=4, help="average comments per recipe")
+    parser.add_argument("--jwt-secret", default=None, help="signs tokens returned by /auth/v1/token")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.recipes, args.users, args.comments, args.jwt_secret)
+    print(f"listening on {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""In-memory stand-in for the Supabase client used by the benchmark scripts.
+
+Implements the part of the PostgREST query surface the routes rely on:
+column projection and embedded resources in `select()` (following
+FOREIGN_KEYS, including `rel(count)` and per-embed order and limit),
+eq/neq/gt/gte/lt/lte/in/like/ilike/is filters, `or_()` with nested
+`and(...)`, a word-match stand-in for full-text search, ordering, limit,
+offset and exact counts. Every `execute()` sleeps for `latency` seconds to
+model a PostgREST round-trip and is counted in `calls`. `auth` covers
+`get_user` and `sign_up` with the same latency, counted under the "auth"
+table name. Calls are also reported to utils.metrics like the real client's
+transport does, so metrics and query traces work against the fake.
+benchmarks/fake_server.py serves the same tables over HTTP.
+"""
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import jwt
+
+from utils.metrics import record_upstream
+
+# (table, column) -> referenced table; every reference points at its `id`
+FOREIGN_KEYS = {
+    ("recipe", "created_by"): "User",
+    ("comment", "user_id"): "User",
+    ("comment", "recipe_id"): "recipe",
+    ("savedrecipe", "user_id"): "User",
+    ("savedrecipe", "recipe_id"): "recipe",
+    ("report", "user_id"): "User",
+    ("report", "recipe_id"): "recipe",
+    ("contact_us", "user_id"): "User",
+}
+
+TEXT_SEARCH_COLUMNS = ("title", "ingredients", "description")
+
+# Column the database fills with now() on insert
+TIMESTAMP_COLUMNS = {"report": "reported_at", "recipe_tombstone": "deleted_at"}
+# Kept current on every update, like the moddatetime trigger on the real table
+UPDATED_AT_COLUMNS = {"recipe": "updated_at"}
+# References declared `on delete cascade`: deleting a user removes their recipes
+CASCADE_DELETES = {("recipe", "created_by")}
+# table -> (table, column) the AFTER DELETE trigger records each deleted row's id in
+DELETE_TRIGGERS = {"recipe": ("recipe_tombstone", "recipe_id")}
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def split_top_level(text):
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, current, depth, quoted, escaped = [], [], 0, False, False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif quoted and char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and not depth and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        # Inside double quotes a backslash escapes the next character
+        return re.sub(r"\\(.)", r"\1", value[1:-1], flags=re.S)
+    return value
+
+
+def parse_value(op, value):
+    if op == "in":
+        return [_unquote(part) for part in split_top_level(value[1:-1])]
+    return _unquote(value)
+
+
+def parse_condition(text):
+    """`col.op.value`, `and(...)` or `or(...)` in PostgREST syntax -> (column, op, value)."""
+    for group in ("and", "or"):
+        if text.startswith(group + "("):
+            return None, group, [parse_condition(part) for part in split_top_level(text[len(group) + 1:-1])]
+    column, op, value = text.split(".", 2)
+    return column, op, parse_value(op, value)
+
+
+def parse_select(text):
+    """Parse a select string into ("column", alias, name) and ("embed", alias, name, items) tuples."""
+    items = []
+    for part in split_top_level(re.sub(r"\s+", "", text or "*")):
+        if "(" in part:
+            head, inner = part.split("(", 1)
+            alias, _, name = head.rpartition(":")
+            name = name.split("!")[0]
+            items.append(("embed", alias or name, name, parse_select(inner[:-1])))
+        elif part:
+            alias, _, name = part.rpartition(":")
+            items.append(("column", alias or name, name.split("::")[0]))
+    return items
+
+
+def _coerce(row_value, value):
+    # Filter values arrive as text; compare them as the column's type
+    if isinstance(row_value, bool):
+        return row_value, str(value).lower() == "true"
+    if isinstance(row_value, (int, float)):
+        try:
+            return row_value, float(value)
+        except (TypeError, ValueError):
+            pass
+    return str(row_value), str(value)
+
+
+def _like(pattern, flags=0):
+    regex, escaped = "", False
+    # PostgREST rewrites every * to % before Postgres reads the escapes
+    for char in pattern.replace("*", "%"):
+        if escaped:
+            regex += re.escape(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            regex += ".*"
+        elif char == "_":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return re.compile(regex + r"\Z", flags | re.DOTALL)
+
+
+_COMPARE = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def matches(row, condition):
+    column, op, value = condition
+    if op == "and":
+        return all(matches(row, child) for child in value)
+    if op == "or":
+        return any(matches(row, child) for child in value)
+    if "fts" in op:
+        text = " ".join(str(row.get(name) or "") for name in TEXT_SEARCH_COLUMNS).lower()
+        return all(word in text for word in re.findall(r"\w+", str(value).lower()))
+
+    row_value = row.get(column)
+    if op == "is":
+        return row_value is None if value == "null" else str(row_value).lower() == value
+    if row_value is None:
+        return False
+    if op == "in":
+        return any(a == b for a, b in (_coerce(row_value, item) for item in value))
+    if op in ("like", "ilike"):
+        return bool(_like(value, re.IGNORECASE if op == "ilike" else 0).match(str(row_value)))
+    try:
+        return _COMPARE[op](*_coerce(row_value, value))
+    except TypeError:
+        return False
+
+
+def sort_rows(rows, orders):
+    for column, desc in reversed(orders):
+        present = sorted((row for row in rows if row.get(column) is not None),
+                         key=lambda row: row[column], reverse=desc)
+        missing = [row for row in rows if row.get(column) is None]
+        # PostgREST puts nulls first on descending sorts and last on ascending ones
+        rows = missing + present if desc else present + missing
+    return rows
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.columns = "*"
+        self.filters = []
+        self.orders = []
+        self.foreign = {}
+        self.row_limit = None
+        self.row_offset = 0
+        self.count = None
+        self.head = False
+
+    def select(self, *columns, count=None, head=None):
+        self.columns = ",".join(columns) or "*"
+        self.count = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.action = "insert"
+        self.payload = payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self.action = "update"
+        self.payload = payload
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    def filter(self, column, operator, criteria):
+        """A filter in PostgREST's text form, e.g. filter("id", "in", "(1,2)")."""
+        self.filters.append((column, operator, parse_value(operator, str(criteria))))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, "eq", value))
+        return self
+
+    def neq(self, column, value):
+        self.filters.append((column, "neq", value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append((column, "gt", value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append((column, "gte", value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, "lt", value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append((column, "lte", value))
+        return self
+
+    def like(self, column, pattern):
+        self.filters.append((column, "like", pattern))
+        return self
+
+    def ilike(self, column, pattern):
+        self.filters.append((column, "ilike", pattern))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, "in", list(values)))
+        return self
+
+    def or_(self, filters, reference_table=None):
+        self.filters.append((None, "or", [parse_condition(part) for part in split_top_level(filters)]))
+        return self
+
+    def text_search(self, column, query, options=None):
+        self.filters.append((column, "fts", query))
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        if foreign_table:
+            self.foreign.setdefault(foreign_table, {}).setdefault("orders", []).append((column, desc))
+        else:
+            self.orders.append((column, desc))
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        if foreign_table:
+            self.foreign.setdefault(foreign_table, {})["limit"] = int(size)
+        else:
+            self.row_limit = int(size)
+        return self
+
+    def offset(self, size):
+        self.row_offset = int(size)
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        return self.offset(start).limit(end - start + 1, foreign_table=foreign_table)
+
+    def _candidates(self, rows):
+        # Narrow by the first eq/in filter through an index instead of scanning the table
+        for column, op, value in self.filters:
+            if column and op == "eq":
+                return self.client.index(self.table, column).get(str(value), [])
+            if column and op == "in":
+                index = self.client.index(self.table, column)
+                return [row for key in dict.fromkeys(map(str, value)) for row in index.get(key, [])]
+        return rows
+
+    def execute(self):
+        self.client.record(self.table)
+        with self.client.data_lock:
+            return self._execute()
+
+    def _execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+
+        if self.action == "insert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = [self.client.new_row(self.table, row) for row in payload]
+            rows.extend(inserted)
+            self.client.changed(self.table)
+            return FakeResponse([dict(row) for row in inserted])
+
+        matched = [row for row in self._candidates(rows) if all(matches(row, f) for f in self.filters)]
+
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+                if self.table in UPDATED_AT_COLUMNS:
+                    row[UPDATED_AT_COLUMNS[self.table]] = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+            self.client.changed(self.table)
+            return FakeResponse([dict(row) for row in matched])
+
+        if self.action == "delete":
+            self.client.delete_rows(self.table, matched)
+            return FakeResponse([dict(row) for row in matched])
+
+        matched = sort_rows(matched, self.orders)
+        total = len(matched)
+        matched = matched[self.row_offset:]
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        if self.head:
+            matched = []
+        items = parse_select(self.columns)
+        data = [self.client.project(self.table, row, items, self.foreign) for row in matched]
+        return FakeResponse(data, total if self.count else None)
+
+
+class FakeAuth:
+    def __init__(self, client):
+        self.client = client
+
+    def get_user(self, token):
+        # Trusts the token's claims; signature checks are the verifier's job
+        self.client.record("auth")
+        claims = jwt.decode(token, options={"verify_signature": False})
+        return SimpleNamespace(user=SimpleNamespace(id=claims["sub"]))
+
+    def sign_up(self, credentials):
+        self.client.record("auth")
+        return SimpleNamespace(user=SimpleNamespace(id=str(uuid.uuid4()), email=credentials["email"]))
+
+
+class FakeSupabase:
+    def __init__(self, tables=None, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.calls_by_table = {}
+        self.auth = FakeAuth(self)
+        self._lock = threading.Lock()
+        self.data_lock = threading.RLock()
+        self.tables = tables or {}
+
+    @property
+    def tables(self):
+        return self._tables
+
+    @tables.setter
+    def tables(self, tables):
+        self._tables = tables
+        self._indexes = {}
+        self._next_ids = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def record(self, table):
+        with self._lock:
+            self.calls += 1
+            self.calls_by_table[table] = self.calls_by_table.get(table, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if table == "auth":
+            record_upstream("supabase_auth", "user", self.latency)
+        else:
+            record_upstream("supabase_rest", table, self.latency)
+
+    def index(self, table, column):
+        """{str(value): [rows]} for one column, rebuilt lazily after writes to the table."""
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {}
+            for row in self.tables.get(table, []):
+                index.setdefault(str(row.get(column)), []).append(row)
+            self._indexes[(table, column)] = index
+        return index
+
+    def changed(self, table):
+        for key in [key for key in self._indexes if key[0] == table]:
+            del self._indexes[key]
+
+    def project(self, table, row, items, foreign=None):
+        shaped = {}
+        for item in items:
+            if item[0] == "column":
+                if item[2] == "*":
+                    shaped.update(row)
+                else:
+                    shaped[item[1]] = row.get(item[2])
+            else:
+                _, alias, name, children = item
+                shaped[alias] = self._embed(table, row, name, children, (foreign or {}).get(name, {}))
+        return shaped
+
+    def _embed(self, table, row, name, items, options):
+        # `name` is either a foreign-key column (User:created_by) or a related table
+        target = FOREIGN_KEYS.get((table, name))
+        if target:
+            return self._to_one(target, row.get(name), items)
+
+        for (child, column), parent in FOREIGN_KEYS.items():
+            if child == table and parent == name:
+                return self._to_one(name, row.get(column), items)
+
+        for (child, column), parent in FOREIGN_KEYS.items():
+            if child == name and parent == table:
+                related = self.index(name, column).get(str(row.get("id")), [])
+                if items == [("column", "count", "count")]:
+                    return [{"count": len(related)}]
+                related = sort_rows(list(related), options.get("orders", []))
+                if options.get("limit") is not None:
+                    related = related[:options["limit"]]
+                return [self.project(name, related_row, items) for related_row in related]
+
+        raise ValueError(f"No relationship between {table} and {name}")
+
+    def _to_one(self, table, value, items):
+        rows = self.index(table, "id").get(str(value), [])
+        return self.project(table, rows[0], items) if rows else None
+
+    def new_row(self, table, row):
+        row = dict(row)
+        if table == "User":
+            row.setdefault("id", str(uuid.uuid4()))
+        elif "id" not in row:
+            if table not in self._next_ids:
+                existing = [r["id"] for r in self.tables.get(table, []) if isinstance(r.get("id"), int)]
+                self._next_ids[table] = max(existing, default=0) + 1
+            row["id"] = self._next_ids[table]
+            self._next_ids[table] += 1
+        created = row.setdefault(TIMESTAMP_COLUMNS.get(table, "created_at"), datetime.now(timezone.utc).isoformat(timespec="microseconds"))
+        if table in UPDATED_AT_COLUMNS:
+            row.setdefault(UPDATED_AT_COLUMNS[table], created)
+        return row
+
+    def delete_rows(self, table, matched):
+        removed = {id(row) for row in matched}
+        self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in removed]
+        self.changed(table)
+
+        if table in DELETE_TRIGGERS:
+            tombstones, column = DELETE_TRIGGERS[table]
+            self.tables.setdefault(tombstones, []).extend(self.new_row(tombstones, {column: row["id"]}) for row in matched)
+            self.changed(tombstones)
+        ids = {str(row["id"]) for row in matched}
+        for child, column in CASCADE_DELETES:
+            if FOREIGN_KEYS[(child, column)] == table:
+                self.delete_rows(child, [row for row in self.tables.get(child, []) if str(row.get(column)) in ids])
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.calls_by_table = {}
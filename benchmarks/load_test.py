@@ -0,0 +1,276 @@
+"""End-to-end load test of the Flask app in main.py against benchmarks/fake_server.py.
+
+Starts the fake Supabase/Cloudinary server in a subprocess, so its work does
+not compete with the app for the GIL, points the real clients at it and
+drives the app's WSGI stack from concurrent client threads with a weighted
+mix of requests:
+
+    python -m benchmarks.load_test --mix browse
+    python -m benchmarks.load_test --mix all --duration 30 --concurrency 32 --latency 0.03
+
+Mixes: browse, search, save, comment, admin, mixed (all of them weighted
+like production traffic) and "all" to run each in turn. Reports throughput
+and p50/p95/p99 per endpoint, the mean Supabase calls per request (from the
+X-Query-Count header) and the calls the fake server saw per table.
+"""
+import argparse
+import os
+import random
+import re
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import jwt
+
+from benchmarks.bench_search import WORDS
+
+
+def start_server(args):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_server", "--port", "0",
+         "--latency", str(args.latency), "--recipes", str(args.recipes),
+         "--users", str(args.users), "--comments", str(args.comments),
+         "--jwt-secret", os.environ["SUPABASE_JWT_SECRET"]],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if not line.startswith("listening on"):
+        process.kill()
+        raise RuntimeError(f"fake server did not start: {line!r}")
+    return process, int(line.split()[-1])
+
+
+def mint_token(user_id):
+    claims = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 24 * 3600}
+    return jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+
+class Context:
+    """Users, tokens and recipe ids a scenario picks from; one per client thread."""
+
+    def __init__(self, users, recipe_ids, seed):
+        self.rng = random.Random(seed)
+        self.users = [user for user in users if not user["is_admin"]]
+        self.admins = [user for user in users if user["is_admin"]]
+        self.recipe_ids = recipe_ids
+
+    def auth(self, admin=False):
+        user = self.rng.choice(self.admins if admin else self.users)
+        return {"Authorization": f"Bearer {user['token']}"}
+
+    def recipe_id(self):
+        # Popular recipes get most of the reads
+        return self.recipe_ids[min(int(self.rng.paretovariate(1.2)) - 1, len(self.recipe_ids) - 1)]
+
+    def words(self, low=1, high=2):
+        return " ".join(self.rng.choices(WORDS[:60], k=self.rng.randint(low, high)))
+
+
+def browse_feed(client, ctx):
+    response = client.get("/api/get_all_recipe?limit=20")
+    cursor = response.get_json().get("next_cursor") if response.status_code == 200 else None
+    if cursor and ctx.rng.random() < 0.3:
+        return client.get(f"/api/get_all_recipe?limit=20&cursor={cursor}")
+    return response
+
+
+def browse_recipe(client, ctx):
+    return client.get(f"/api/get_recipe/{ctx.recipe_id()}")
+
+
+def browse_comments(client, ctx):
+    return client.get(f"/api/get_comments/{ctx.recipe_id()}?limit=20")
+
+
+def browse_profile(client, ctx):
+    return client.get("/api/profile", headers=ctx.auth())
+
+
+def validate(client, ctx):
+    return client.get("/api/validate_token", headers=ctx.auth())
+
+
+def saved_list(client, ctx):
+    return client.get("/api/get_save_recipe", headers=ctx.auth())
+
+
+def search_text(client, ctx):
+    return client.post("/api/search_recipe", json={"query": ctx.words(), "limit": 20}, headers=ctx.auth())
+
+
+def search_ingredients(client, ctx):
+    wanted = ctx.words(1, 3).split()
+    return client.post("/api/recipes_by_ingredients", json={"ingredients": wanted, "limit": 20}, headers=ctx.auth())
+
+
+def save(client, ctx):
+    return client.post("/api/save_recipe", json={"recipe_id": ctx.recipe_id()}, headers=ctx.auth())
+
+
+def unsave(client, ctx):
+    return client.post("/api/unsave_recipe", json={"recipe_id": ctx.recipe_id()}, headers=ctx.auth())
+
+
+def save_bulk(client, ctx):
+    recipe_ids = [ctx.recipe_id() for _ in range(10)]
+    return client.post("/api/save_recipes", json={"recipe_ids": recipe_ids}, headers=ctx.auth())
+
+
+def comment(client, ctx):
+    body = {"recipe_id": ctx.recipe_id(), "content": ctx.words(3, 12)}
+    return client.post("/api/create_comment", json=body, headers=ctx.auth())
+
+
+def admin_users(client, ctx):
+    return client.get("/api/get_all_users?limit=50", headers=ctx.auth(admin=True))
+
+
+def admin_search_users(client, ctx):
+    body = {"query": f"user{ctx.rng.randint(1, 99)}", "limit": 20}
+    return client.post("/api/search_user", json=body, headers=ctx.auth(admin=True))
+
+
+def admin_reports(client, ctx):
+    return client.get("/api/get_report_messages?limit=50", headers=ctx.auth(admin=True))
+
+
+def admin_contacts(client, ctx):
+    return client.get("/api/get_contact_messages?limit=50", headers=ctx.auth(admin=True))
+
+
+def admin_export(client, ctx):
+    response = client.get("/api/export/reports?format=ndjson", headers=ctx.auth(admin=True))
+    response.get_data()  # drains the stream, so every page is fetched inside the timing
+    return response
+
+
+# (weight, scenario) per mix
+MIXES = {
+    "browse": [(40, browse_feed), (30, browse_recipe), (15, browse_comments), (5, browse_profile),
+               (5, validate), (5, saved_list)],
+    "search": [(70, search_text), (30, search_ingredients)],
+    "save": [(35, save), (25, unsave), (10, save_bulk), (30, saved_list)],
+    "comment": [(40, comment), (60, browse_comments)],
+    "admin": [(25, admin_users), (25, admin_search_users), (20, admin_reports), (20, admin_contacts),
+              (10, admin_export)],
+}
+MIXES["mixed"] = [
+    (weight * share, scenario)
+    for mix, share in (("browse", 60), ("search", 20), ("save", 10), ("comment", 8), ("admin", 2))
+    for weight, scenario in MIXES[mix]
+]
+
+
+ID_SEGMENT = re.compile(r"/(\d+|[0-9a-f]{8}-[0-9a-f-]{27})(?=/|$)")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_mix(app, mix, contexts, duration, fake):
+    weights, scenarios = zip(*MIXES[mix])
+    results = defaultdict(lambda: {"latencies": [], "queries": 0, "4xx": 0, "5xx": 0})
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(ctx):
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            scenario = ctx.rng.choices(scenarios, weights)[0]
+            started = time.perf_counter()
+            response = scenario(client, ctx)
+            elapsed = time.perf_counter() - started
+            endpoint = f"{response.request.method} {ID_SEGMENT.sub('/<id>', response.request.path)}"
+            with lock:
+                result = results[endpoint]
+                result["latencies"].append(elapsed)
+                result["queries"] += int(response.headers.get("X-Query-Count", 0))
+                if 400 <= response.status_code < 500:
+                    result["4xx"] += 1
+                elif response.status_code >= 500:
+                    result["5xx"] += 1
+
+    fake.post("/__reset")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, args=(ctx,)) for ctx in contexts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    upstream = fake.get("/__stats").json()
+
+    total = sum(len(result["latencies"]) for result in results.values())
+    print(f"\n== {mix}: {len(contexts)} clients, {elapsed:.1f} s, {total} requests, {total / elapsed:.1f} req/s, "
+          f"{upstream['calls']} upstream calls ({upstream['calls'] / max(total, 1):.2f}/request)")
+    print(f"{'endpoint':<36} {'count':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'queries':>8} {'4xx':>5} {'5xx':>5}")
+    for name, result in sorted(results.items(), key=lambda item: -len(item[1]["latencies"])):
+        latencies = [sample * 1000 for sample in result["latencies"]]
+        count = len(latencies)
+        print(f"{name:<36} {count:>6} {count / elapsed:>7.1f} {percentile(latencies, 50):>8.1f} "
+              f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} "
+              f"{result['queries'] / count:>8.2f} {result['4xx']:>5} {result['5xx']:>5}")
+    by_table = ", ".join(f"{table} {calls}" for table, calls in
+                         sorted(upstream["calls_by_table"].items(), key=lambda item: -item[1]))
+    print(f"upstream by table: {by_table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", default="mixed", choices=[*MIXES, "all"])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mix")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the fake server adds per call")
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=4, help="average comments per recipe")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_JWT_SECRET", secrets.token_hex(32))
+    server, port = start_server(args)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        # Must be set before main (and with it every client and config module) is imported
+        os.environ.update({
+            "SUPABASE_URL": base_url,
+            "SUPABASE_ANON_KEY": "anon",
+            "SUPABASE_SERVICE_ROLE_KEY": "service",
+            "QUERY_TRACE_HEADERS": "true",
+            "LOG_SAMPLE_RATE": "0",
+            # Every client thread shares one address; limits would cap the measurement
+            "RATE_LIMIT_ENABLED": "false",
+        })
+        import cloudinary
+        from main import app
+
+        cloudinary.config(upload_prefix=base_url, cloud_name="bench", api_key="key", api_secret="secret")
+
+        fake = httpx.Client(base_url=base_url)
+        users = fake.get("/rest/v1/User", params={"select": "id,is_admin"}).json()
+        for user in users:
+            user["token"] = mint_token(user["id"])
+        recipe_ids = [row["id"] for row in fake.get("/rest/v1/recipe", params={"select": "id", "order": "created_at.desc"}).json()]
+        contexts = [Context(users, recipe_ids, seed) for seed in range(args.concurrency)]
+
+        # Builds the search and ingredient indexes and fills the caches once, outside the timings
+        warmup = app.test_client()
+        for scenario in {scenario for scenarios in MIXES.values() for _, scenario in scenarios}:
+            scenario(warmup, contexts[0])
+
+        for mix in ([*MIXES] if args.mix == "all" else [args.mix]):
+            run_mix(app, mix, contexts, args.duration, fake)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,56 @@
-from flask import Flask, request, jsonify
-from supabase import create_client, Client
+from flask import Flask, Response, request, jsonify
 from dotenv import load_dotenv
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from utils.token_required import token_required
+from utils.jwt_verifier import token_cache_stats, verify_token
+from utils.concurrency import SingleFlight, run_concurrently
+from utils.images import IMAGE_MAX_BYTES
+from utils.supabase_clients import init_clients, supabase
+from utils.query_trace import init_query_trace
+from utils.metrics import init_metrics, render as render_metrics
+from utils.compression import init_compression
+from utils.json_provider import OrjsonProvider
+from utils.logs import log_sampled
+from utils.rate_limit import rate_limited
+from utils.response_cache import response_cache_stats
+from utils.uploads import upload_stats
 from routes.admin import admin_bp
 from routes.auth_routes import auth_bp
 from routes.recipe_routes import recipe_bp
 from routes.comment_routes import comment_bp
 from routes.user_routes import user_bp
+from routes.sync_routes import sync_bp
+import hashlib
+import jwt
 import os
 
 load_dotenv()
 app = Flask(__name__)
+# Reverse proxies in front of the app that append to X-Forwarded-For. The
+# client address is read that many entries from the right, so a client
+# cannot pick its own by sending the header; 0 uses the socket address
+PROXY_HOPS = int(os.getenv("PROXY_HOPS", "0"))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+app.json = OrjsonProvider(app)
+# Reject oversized uploads from Content-Length before the body is read;
+# leave headroom for the other multipart form fields
+app.config["MAX_CONTENT_LENGTH"] = IMAGE_MAX_BYTES + 1024 * 1024
 CORS(app, origins=["https://green-spoon.vercel.app","http://localhost:5173"], supports_credentials=True)
 # CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Pooled anon and service-role clients, shared by every blueprint
+init_clients(app)
+init_query_trace(app)
+init_metrics(app)
+init_compression(app)
 
+# Optional bearer token guarding /api/metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-app.supabase = supabase
+# Concurrent validate_token calls for one token share a single lookup
+_validations = SingleFlight()
 
 
 # SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -29,7 +58,33 @@ app.supabase = supabase
 
 # supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+def fetch_user(user_id):
+    return supabase.table("User").select("*").eq("id", user_id).execute()
+
+
+def verify_and_fetch_user(token):
+    # The user row is fetched for the token's unverified `sub` while the token
+    # is being verified; it is only used if verification yields the same id
+    try:
+        claimed_id = jwt.decode(token, options={"verify_signature": False}).get("sub")
+    except jwt.PyJWTError:
+        claimed_id = None
+
+    if not claimed_id:
+        user_id = verify_token(supabase, token)
+        return user_id, fetch_user(user_id) if user_id else None
+
+    user_id, user_data = run_concurrently(
+        lambda: verify_token(supabase, token),
+        lambda: fetch_user(claimed_id),
+    )
+    if user_id and user_id != claimed_id:
+        user_data = fetch_user(user_id)
+    return user_id, user_data
+
+
 @app.route("/api/validate_token", methods=["GET", "OPTIONS"])
+@rate_limited("validate_token")
 def validate_token():
     if request.method == "OPTIONS":
         return jsonify({"message": "CORS preflight"}), 200
@@ -41,12 +96,13 @@ def validate_token():
     token = auth_header.split("Bearer ")[1].strip()
 
     try:
-        response = supabase.auth.get_user(token)
-        user = response.user
-        if not user:
+        user_id, user_data = _validations.do(
+            hashlib.sha256(token.encode()).hexdigest(),
+            lambda: verify_and_fetch_user(token),
+        )
+        if not user_id:
             raise ValueError("Invalid or expired token")
 
-        user_data = supabase.table("User").select("*").eq("id", user.id).execute()
         if not user_data.data:
             return jsonify({"valid": False, "error": "User not found"}), 401
 
@@ -88,7 +144,7 @@ def contact(user_id):
     }
     try:
         supabase.table("contact_us").insert(contact_data).execute()
-        print(f"User {user_id} contacted support with message: {message}")
+        log_sampled("contact", sample_rate=1, user_id=user_id, message_length=len(message))
         return jsonify({"message": "Support request submitted successfully"}), 200
     except Exception as e:
         print(f"Error submitting support request: {str(e)}")
@@ -101,11 +157,28 @@ def health_check():
     return jsonify({"status": "ok"}), 200
 
 
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+
+    gauges = {}
+    for prefix, stats in (
+        ("token_cache", token_cache_stats()),
+        ("response_cache", response_cache_stats()),
+        ("uploads", upload_stats()),
+    ):
+        gauges.update({f"{prefix}_{name}": value for name, value in stats.items()})
+    gauges["validate_token_coalesced"] = _validations.coalesced
+    return Response(render_metrics(gauges), mimetype="text/plain; version=0.0.4")
+
+
 app.register_blueprint(admin_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(recipe_bp)
 app.register_blueprint(comment_bp)
 app.register_blueprint(user_bp)
+app.register_blueprint(sync_bp)
 
 if __name__ == "__main__":
     app.run(debug=True)
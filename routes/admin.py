@@ -1,6 +1,14 @@
-from flask import Blueprint, jsonify, current_app, request, redirect, url_for
+from flask import Blueprint, Response, jsonify, request, redirect, url_for, stream_with_context
+from utils.supabase_clients import supabase, supabase_admin
 from utils.token_required import token_required, admin_required
-from supabase import create_client, Client
+from utils.user_roles import invalidate_user
+from utils.profile_stats import invalidate_profile
+from utils.bulk import item_results, parse_ids
+from utils.concurrency import run_concurrently
+from utils.pagination import iter_pages, paginate, parse_fields, parse_page_size
+from utils.export import EXPORT_FORMATS, EXPORT_PAGE_SIZE, csv_chunks, ndjson_chunks
+from datetime import datetime, timezone
+from functools import partial
 import cloudinary
 from dotenv import load_dotenv
 import os
@@ -8,13 +16,10 @@ import os
 load_dotenv()
 
 admin_bp = Blueprint("admin", __name__)
-supabase = None
 
 cloud_name = os.getenv("CLAUD_NAME")
 api_key = os.getenv("CLAUD_API_KEY")
 api_secret = os.getenv("CLAUD_API_SECRET")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 # print(cloud_name)
 # print(api_key)
@@ -27,11 +32,63 @@ cloudinary.config(
     secure=True
 )
 
-@admin_bp.before_app_request
-def setup_supabase():
-    global supabase
-    if not supabase:
-        supabase = current_app.supabase
+# Columns an admin may request through `fields` on the listings
+USER_LIST_FIELDS = {"id", "name", "username", "email", "profile_picture_url", "is_admin"}
+CONTACT_LIST_FIELDS = {"id", "user_id", "name", "email", "phone", "message", "created_at"}
+REPORT_LIST_FIELDS = {"id", "recipe_id", "user_id", "message", "reported_at"}
+
+
+def date_range(query, column):
+    # `from` is inclusive and `to` exclusive; both ISO 8601 dates or timestamps
+    for param, op in (("from", "gte"), ("to", "lt")):
+        value = request.args.get(param)
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{param} must be an ISO 8601 date or timestamp")
+            query = getattr(query, op)(column, value)
+    return query
+
+
+def filter_users(query):
+    admin_filter = request.args.get("is_admin")
+    if admin_filter:
+        if admin_filter not in ("true", "false"):
+            raise ValueError("is_admin must be true or false")
+        query = query.eq("is_admin", admin_filter)
+    return query
+
+
+def filter_contacts(query):
+    query = date_range(query, "created_at")
+    for param in ("user_id", "email"):
+        if request.args.get(param):
+            query = query.eq(param, request.args.get(param))
+    return query
+
+
+def filter_reports(query):
+    query = date_range(query, "reported_at")
+    if request.args.get("recipe_id"):
+        query = query.eq("recipe_id", request.args.get("recipe_id"))
+    if request.args.get("reporter"):
+        query = query.eq("user_id", request.args.get("reporter"))
+    return query
+
+
+# resource -> (table, exportable columns, sort column, newest first, filters)
+EXPORTS = {
+    "users": ("User", USER_LIST_FIELDS, "username", False, filter_users),
+    "contacts": ("contact_us", CONTACT_LIST_FIELDS, "created_at", True, filter_contacts),
+    "reports": ("report", REPORT_LIST_FIELDS, "reported_at", True, filter_reports),
+}
+
+
+def escape_like(text):
+    # PostgREST turns every * into % before Postgres sees it, escaped or not,
+    # so * can only be sent as the _ wildcard; callers re-check those matches
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
 
 
 @admin_bp.route("/api/get_all_users", methods=['GET'])
@@ -39,8 +96,19 @@ def setup_supabase():
 @admin_required
 def get_all_users(user_id):
     try:
-        users = supabase.table("User").select("*").execute()
-        return jsonify(users.data), 200
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    try:
+        # Listed alphabetically; username and id make up the cursor
+        columns = parse_fields(request.args.get("fields"), USER_LIST_FIELDS, ("id", "username"))
+        query = filter_users(supabase.table("User").select(", ".join(columns)))
+
+        users, next_cursor = paginate(query, request.args.get("cursor"), limit, column="username", desc=False)
+        return jsonify({"users": users, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     
@@ -66,9 +134,10 @@ def get_user(user_id, user_id2):
 def remove_user(user_id, user_id2):
     try:
         supabase.table("User").delete().eq("id", user_id2).execute()
+        invalidate_user(user_id2)
+        invalidate_profile(user_id2)
 
-        admin_client:Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-        admin_client.auth.admin.delete_user(user_id2)
+        supabase_admin.auth.admin.delete_user(user_id2)
 
         return jsonify({"message": "User removed successfully"}), 200
     except Exception as e:
@@ -81,8 +150,18 @@ def remove_user(user_id, user_id2):
 @admin_required
 def get_contact_messages(user_id):
     try:
-        messages = supabase.table("contact_us").select("*").order("created_at", desc=True).execute()
-        return jsonify(messages.data), 200
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    try:
+        columns = parse_fields(request.args.get("fields"), CONTACT_LIST_FIELDS, ("id", "created_at"))
+        query = filter_contacts(supabase.table("contact_us").select(", ".join(columns)))
+
+        messages, next_cursor = paginate(query, request.args.get("cursor"), limit)
+        return jsonify({"messages": messages, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     
@@ -92,8 +171,13 @@ def get_contact_messages(user_id):
 @admin_required
 def get_report_messages(user_id):
     try:
-        messages = supabase.table("report").select("""
-            *,
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    try:
+        columns = parse_fields(request.args.get("fields"), REPORT_LIST_FIELDS, ("id", "reported_at"))
+        query = filter_reports(supabase.table("report").select(", ".join(columns) + """,
             reporter:user_id(
                 id,
                 name,
@@ -103,13 +187,59 @@ def get_report_messages(user_id):
                 id,
                 title
             )
-        """).order("reported_at", desc=True).execute()
-        return jsonify(messages.data), 200
+        """))
+
+        reports, next_cursor = paginate(query, request.args.get("cursor"), limit, column="reported_at")
+        return jsonify({"reports": reports, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 400
     
 
 
+@admin_bp.route("/api/export/<string:resource>", methods=['GET'])
+@token_required
+@admin_required
+def export(user_id, resource):
+    if resource not in EXPORTS:
+        return jsonify({"error": f"Unknown export: {resource}"}), 404
+
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    table, allowed, column, desc, apply_filters = EXPORTS[resource]
+    try:
+        columns = parse_fields(request.args.get("fields"), allowed, ("id", column))
+        # Validate the filters now; once streaming starts the status is already sent
+        apply_filters(supabase.table(table).select("id"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    select = ", ".join(columns)
+    pages = iter_pages(
+        lambda: apply_filters(supabase.table(table).select(select)),
+        page_size=EXPORT_PAGE_SIZE, column=column, desc=desc,
+    )
+
+    def generate():
+        chunks = ndjson_chunks(pages) if export_format == "ndjson" else csv_chunks(pages, None if columns == ["*"] else columns)
+        try:
+            yield from chunks
+        except Exception as e:
+            # Aborts the chunked response so the client sees a truncated download
+            print(f"Export of {resource} failed:", e)
+            raise
+
+    filename = f"{resource}-{datetime.now(timezone.utc):%Y%m%d}.{export_format}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @admin_bp.route("/api/remove_report/<string:report_id>", methods=['DELETE'])
 @token_required
 @admin_required
@@ -132,6 +262,79 @@ def remove_contact(user_id, contact_id):
         return jsonify({"error": str(e)}), 400
     
 
+@admin_bp.route("/api/remove_reports", methods=['DELETE'])
+@token_required
+@admin_required
+def remove_reports(user_id):
+    try:
+        report_ids = parse_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        removed = supabase.table("report").delete().in_("id", report_ids).execute()
+        results = item_results(report_ids, [row["id"] for row in removed.data], "removed", "not_found")
+        return jsonify({"results": results, "removed": len(removed.data)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@admin_bp.route("/api/remove_contacts", methods=['DELETE'])
+@token_required
+@admin_required
+def remove_contacts(user_id):
+    try:
+        contact_ids = parse_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        removed = supabase.table("contact_us").delete().in_("id", contact_ids).execute()
+        results = item_results(contact_ids, [row["id"] for row in removed.data], "removed", "not_found")
+        return jsonify({"results": results, "removed": len(removed.data)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def delete_auth_user(user_id):
+    # Returns the error message instead of raising so one failure does not hide the others
+    try:
+        supabase_admin.auth.admin.delete_user(user_id)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+@admin_bp.route("/api/remove_users", methods=['DELETE'])
+@token_required
+@admin_required
+def remove_users(user_id):
+    try:
+        user_ids = parse_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        removed = supabase.table("User").delete().in_("id", user_ids).execute()
+        removed_ids = [row["id"] for row in removed.data]
+        for removed_id in removed_ids:
+            invalidate_user(removed_id)
+            invalidate_profile(removed_id)
+
+        # The auth admin API deletes one user per call; run them side by side
+        errors = dict(zip(map(str, removed_ids), run_concurrently(*[partial(delete_auth_user, i) for i in removed_ids])))
+
+        results = item_results(user_ids, removed_ids, "removed", "not_found")
+        for result in results:
+            error = errors.get(str(result["id"]))
+            if error:
+                result.update({"status": "auth_delete_failed", "error": error})
+
+        return jsonify({"results": results, "removed": len(removed_ids)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
 @admin_bp.route("/api/search_user", methods=['POST'])
 @token_required
 @admin_required
@@ -142,8 +345,35 @@ def search_user(user_id):
     if not search_query:
         return redirect(url_for("admin.get_all_users"))
 
+    match = data.get("match", "prefix")
+    if match not in ("prefix", "contains"):
+        return jsonify({"error": "match must be prefix or contains"}), 400
+    if match == "contains" and len(search_query) < 3:
+        # Trigrams need three characters; anything shorter would scan the table
+        return jsonify({"error": "contains search needs at least 3 characters"}), 400
+
     try:
-        users = supabase.table("User").select("*").ilike("username", f"%{search_query}%").execute()
-        return jsonify(users.data), 200
+        limit = parse_page_size(data.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    pattern = escape_like(search_query) + "%"
+    if match == "contains":
+        pattern = "%" + pattern
+
+    try:
+        columns = parse_fields(data.get("fields"), USER_LIST_FIELDS, ("id", "username"))
+        query = supabase.table("User").select(", ".join(columns)).ilike("username", pattern)
+        users, next_cursor = paginate(query, data.get("cursor"), limit, column="username", desc=False)
+        if "*" in search_query:
+            # The * went out as a wildcard; keep only usernames with a literal one
+            needle = search_query.lower()
+            users = [
+                user for user in users
+                if (needle in user["username"].lower() if match == "contains" else user["username"].lower().startswith(needle))
+            ]
+        return jsonify({"users": users, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e: 
         return jsonify({"error": str(e)}), 400
\ No newline at end of file
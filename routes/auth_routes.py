@@ -1,17 +1,15 @@
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, jsonify, request
+from utils.supabase_clients import supabase
+from utils.user_roles import is_admin
+from utils.concurrency import run_concurrently
+from utils.logs import log_sampled
+from utils.rate_limit import rate_limited
 
 
 auth_bp = Blueprint("auth", __name__)
-supabase = None
-
-@auth_bp.before_app_request
-def setup_supabase():
-    global supabase
-    if not supabase:
-        supabase = current_app.supabase
-
 
 @auth_bp.route("/api/signup", methods=["POST"])
+@rate_limited("signup")
 def signup():
     data = request.json
     name = data.get("name")
@@ -19,13 +17,14 @@ def signup():
     email = data.get("email")
     password = data.get("password")
 
-    existing_user = supabase.table("User").select("*").eq("email", email).execute()
-    if existing_user.data:
+    email_taken, username_taken = run_concurrently(
+        lambda: supabase.table("User").select("id").eq("email", email).limit(1).execute(),
+        lambda: supabase.table("User").select("id").eq("username", username).limit(1).execute(),
+    )
+    if email_taken.data:
         return jsonify({"error": "Email already in use"}), 400
-    
 
-    existing_user = supabase.table("User").select("*").eq("username", username).execute()
-    if existing_user.data:
+    if username_taken.data:
         return jsonify({"error": "Username already in use"}), 400
 
     try:
@@ -41,6 +40,7 @@ def signup():
 
 
 @auth_bp.route("/api/login", methods=["POST"])
+@rate_limited("login")
 def login():
     data = request.json
     email = data.get("email")
@@ -50,13 +50,10 @@ def login():
     try:
         res = supabase.auth.sign_in_with_password({"email": email, "password": password})
         token = res.session.access_token
-        print(res.user)
+        log_sampled("login", user_id=res.user.id)
         user_id = res.user.id
 
-        user_data = supabase.table("User").select("is_admin").eq("id", user_id).execute()
-
-        if user_data.data:
-            isAdmin = user_data.data[0]["is_admin"]
+        isAdmin = is_admin(supabase, user_id)
 
         return jsonify({
             "message": "Login successful.",
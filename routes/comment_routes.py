@@ -1,15 +1,11 @@
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, jsonify, request
+from utils.supabase_clients import supabase
 from utils.token_required import token_required
+from utils.pagination import paginate, parse_page_size
+from utils.response_cache import invalidate
+from utils import trending
 
 comment_bp = Blueprint("comment", __name__)
-supabase = None
-
-
-@comment_bp.before_app_request
-def setup_supabase():
-    global supabase
-    if not supabase:
-        supabase = current_app.supabase
 
 
 @comment_bp.route("/api/create_comment", methods = ['POST'])
@@ -23,22 +19,38 @@ def create_comment(user_id):
         return jsonify({"error": "Recipe ID and content are required"}), 400
 
     try:
-        supabase.table("comment").insert({"user_id": user_id, "recipe_id": recipe_id, "comment": content}).execute()
+        created = supabase.table("comment").insert({"user_id": user_id, "recipe_id": recipe_id, "comment": content}).execute()
+        invalidate("recipes", f"recipe:{recipe_id}")
+        for row in created.data:
+            trending.record(row["recipe_id"], "comment", row.get("created_at"))
         return jsonify({"message": "Comment created successfully."}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# @comment_bp.route("/api/get_comments", methods=["GET"])
-# @token_required
-# def get_comments(user_id):
-#     recipe_id = request.args.get("recipe_id")
-
-#     if not recipe_id:
-#         return jsonify({"error": "Recipe ID is required"}), 400
+@comment_bp.route("/api/get_comments/<string:recipe_id>", methods=["GET"])
+def get_comments(recipe_id):
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
 
-#     try:
-#         comments = supabase.table("comments").select("*").eq("recipe_id", recipe_id).execute()
-#         return jsonify({"comments": comments.data}), 200
-#     except Exception as e:
-#         return jsonify({"error": str(e)}), 500
+    try:
+        query = supabase.table("comment").select("""
+            id,
+            comment,
+            created_at,
+            user_id,
+            User (
+                id,
+                name,
+                username,
+                profile_picture_url
+            )
+        """).eq("recipe_id", recipe_id)
+        comments, next_cursor = paginate(query, request.args.get("cursor"), limit)
+        return jsonify({"comments": comments, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
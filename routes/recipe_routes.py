@@ -1,5 +1,17 @@
-from flask import Blueprint, jsonify, current_app, request, redirect, url_for
+from flask import Blueprint, jsonify, request, redirect, url_for
+from utils.supabase_clients import supabase
 from utils.token_required import token_required
+from utils.user_roles import is_admin
+from utils.profile_stats import invalidate_profile
+from utils.pagination import encode_cursor, paginate, parse_fields, parse_page_size
+from utils.bulk import item_results, parse_ids
+from utils.concurrency import run_concurrently
+from utils.response_cache import cached_response, invalidate
+from utils import for_you, ingredient_index, search_index, similar_recipes, trending
+from utils.uploads import submit_upload
+from utils.images import read_upload
+from utils.logs import log_sampled
+from functools import partial
 import cloudinary
 from dotenv import load_dotenv
 import os
@@ -7,12 +19,45 @@ import os
 load_dotenv()
 
 recipe_bp = Blueprint("recipe", __name__)
-supabase = None
 
 cloud_name = os.getenv("CLAUD_NAME")
 api_key = os.getenv("CLAUD_API_KEY")
 api_secret = os.getenv("CLAUD_API_SECRET")
 
+# Ids per `in.(...)` filter; keeps the PostgREST query string well under URL limits
+SAVED_RECIPES_BATCH_SIZE = int(os.getenv("SAVED_RECIPES_BATCH_SIZE", "100"))
+
+# Columns a client may request through `fields` on list endpoints
+RECIPE_LIST_FIELDS = {
+    "id",
+    "title",
+    "description",
+    "ingredients",
+    "instructions",
+    "recipe_image_url",
+    "is_ai_generated",
+    "created_by",
+    "created_at",
+}
+
+# Newest comments embedded in recipe payloads; the rest come from /api/get_comments
+COMMENT_PREVIEW_SIZE = int(os.getenv("COMMENT_PREVIEW_SIZE", "3"))
+
+COMMENT_PREVIEW_SELECT = """
+            comment_count:comment(count),
+            comment (
+                id,
+                comment,
+                created_at,
+                user_id,
+                User (
+                    id,
+                    name,
+                    username,
+                    profile_picture_url
+                )
+            )"""
+
 # print(cloud_name)
 # print(api_key)
 # print(api_secret)
@@ -24,11 +69,51 @@ cloudinary.config(
     secure=True
 )
 
-@recipe_bp.before_app_request
-def setup_supabase():
-    global supabase
-    if not supabase:
-        supabase = current_app.supabase
+def attach_recipe_image(recipe_id, image_url):
+    # Runs on an upload worker once the image is stored
+    supabase.table("recipe").update({"recipe_image_url": image_url}).eq("id", recipe_id).execute()
+    invalidate("recipes", f"recipe:{recipe_id}")
+
+
+def with_comment_preview(query):
+    return (
+        query
+        .order("created_at", desc=True, foreign_table="comment")
+        .order("id", desc=True, foreign_table="comment")
+        .limit(COMMENT_PREVIEW_SIZE, foreign_table="comment")
+    )
+
+
+def flatten_comment_preview(recipes):
+    # comment(count) comes back as [{"count": n}]; also hand the client a
+    # cursor to continue from the last previewed comment when there are more
+    for recipe in recipes:
+        counts = recipe.get("comment_count") or [{"count": 0}]
+        recipe["comment_count"] = counts[0]["count"]
+
+        comments = recipe.get("comment") or []
+        recipe["comments_cursor"] = None
+        if comments and recipe["comment_count"] > len(comments):
+            recipe["comments_cursor"] = encode_cursor([comments[-1]["created_at"], comments[-1]["id"]])
+    return recipes
+
+
+def side_load_users(recipes):
+    # shape=normalized: every author and commenter is sent once in a `users`
+    # map keyed by id, and recipes and comments keep only the id
+    users = {}
+
+    def take(row, id_field):
+        user = row.pop("User", None)
+        if user:
+            users.setdefault(str(user["id"]), {}).update(user)
+            row[id_field] = user["id"]
+
+    for recipe in recipes:
+        take(recipe, "created_by")
+        for comment in recipe.get("comment") or []:
+            take(comment, "user_id")
+    return users
 
 
 @recipe_bp.route("/api/create_recipe", methods = ['POST'])
@@ -44,93 +129,107 @@ def create_recipe(user_id):
         return jsonify({"error": "All fields are required"}), 400
 
     image = request.files.get("image")
-    image_url = None
-
+    image_data = image_digest = None
     if image:
-        upload_result = cloudinary.uploader.upload(image, folder="recipe_images")
-        image_url = upload_result.get("secure_url")
+        # Read now: the upload runs after the request and its stream is closed
+        try:
+            image_data, image_digest = read_upload(image)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     try:
         recipe_data = {
             "created_by": user_id,
             "title": title,
             "ingredients": ingredients,
+            "ingredient_tags": ingredient_index.normalize_ingredients(ingredients),
             "description": description,
             "instructions": instructions,
-            "recipe_image_url": image_url,
+            "recipe_image_url": None,
             "is_ai_generated": is_ai_generated
         }
-        supabase.table("recipe").insert(recipe_data).execute()
-        return jsonify({"message": "Recipe created successfully"}), 201
+        created = supabase.table("recipe").insert(recipe_data).execute()
+        invalidate("recipes")
+        invalidate_profile(user_id)
+        recipe_id = None
+        if created.data:
+            recipe_id = created.data[0]["id"]
+            search_index.index_recipe(created.data[0])
+            ingredient_index.index_recipe(created.data[0])
+            similar_recipes.index_recipe(created.data[0])
+            trending.record(recipe_id, "created", created.data[0].get("created_at"))
+            if image_data:
+                submit_upload(image_data, image_digest, "recipe_images", partial(attach_recipe_image, recipe_id))
+        return jsonify({
+            "message": "Recipe created successfully",
+            "recipe_id": recipe_id,
+            "image_status": "pending" if image_data else None
+        }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @recipe_bp.route("/api/get_recipe/<string:recipe_id>", methods = ['GET'])
+@cached_response("recipe:{recipe_id}")
 def get_recipe(recipe_id):
     if not recipe_id:
         return jsonify({"error": "Recipe ID is required"}), 400
 
     try:
-        recipe = supabase.table("recipe").select("""
+        recipe = with_comment_preview(supabase.table("recipe").select("""
             *,
             User:created_by (
                 id,
                 name,
                 username,
                 profile_picture_url
-            ),
-            comment (
-                id,
-                comment,
-                created_at,
-                user_id,
-                User (
-                    id,
-                    name,
-                    username,
-                    profile_picture_url
-                )
-            )
-        """).eq("id", recipe_id).execute()
+            ),""" + COMMENT_PREVIEW_SELECT).eq("id", recipe_id)).execute()
 
         if not recipe.data:
             return jsonify({"error": "Recipe not found"}), 404
-        
-        print(recipe.data)
 
-        return jsonify({"recipe": recipe.data}), 200
+        log_sampled("get_recipe", recipe_id=recipe_id, comments=len(recipe.data[0].get("comment") or []))
+
+        return jsonify({"recipe": flatten_comment_preview(recipe.data)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 
 @recipe_bp.route("/api/get_all_recipe", methods=['GET'])
+@cached_response("recipes")
 def get_all_recipe():
     try:
-        response = supabase.table("recipe").select("""
-            *,
-            User (
-                id,
-                name,
-                username
-            ),
-            comment (
-                id,
-                comment,
-                created_at,
-                user_id,
-                User (
-                    id,
-                    name,
-                    username,
-                    profile_picture_url
-                )
-            )
-        """).execute()
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    try:
+        # id and created_at are needed to build the next cursor
+        columns = parse_fields(request.args.get("fields"), RECIPE_LIST_FIELDS, ("id", "created_at"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify({"recipes": response.data}), 200
+    select = ", ".join(columns) + ", User (id, name, username)"
 
+    include = {part.strip() for part in request.args.get("include", "").split(",")}
+    if "comments" in include:
+        select += "," + COMMENT_PREVIEW_SELECT
+    else:
+        select += ", comment_count:comment(count)"
+
+    try:
+        query = supabase.table("recipe").select(select)
+        if "comments" in include:
+            query = with_comment_preview(query)
+        recipes, next_cursor = paginate(query, request.args.get("cursor"), limit)
+        payload = {"recipes": flatten_comment_preview(recipes), "next_cursor": next_cursor}
+        if request.args.get("shape") == "normalized":
+            payload["users"] = side_load_users(recipes)
+        return jsonify(payload), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print("Error in get_all_recipe:", e)
         return jsonify({"error": str(e)}), 500
@@ -158,7 +257,11 @@ def save_recipe(user_id):
         return jsonify({"error": "Recipe ID is required"}), 400
 
     try:
-        supabase.table("savedrecipe").insert({"user_id": user_id, "recipe_id": recipe_id}).execute()
+        saved = supabase.table("savedrecipe").insert({"user_id": user_id, "recipe_id": recipe_id}).execute()
+        invalidate_profile(user_id)
+        for_you.invalidate_feed(user_id)
+        for row in saved.data:
+            trending.record(row["recipe_id"], "save", row.get("created_at"))
         return jsonify({"message": "Recipe saved successfully."}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -174,40 +277,113 @@ def unsave_recipe(user_id):
         return jsonify({"error": "Recipe ID is required"}), 400
 
     try:
-        supabase.table("savedrecipe").delete().eq("user_id", user_id).eq("recipe_id", recipe_id).execute()
+        removed = supabase.table("savedrecipe").delete().eq("user_id", user_id).eq("recipe_id", recipe_id).execute()
+        invalidate_profile(user_id)
+        for_you.invalidate_feed(user_id)
+        # Undo the save as of when it happened, so it takes back exactly what it added
+        for row in removed.data:
+            trending.record(row["recipe_id"], "save", row.get("created_at"), count=-1)
         return jsonify({"message": "Recipe unsaved successfully."}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@recipe_bp.route("/api/save_recipes", methods=["POST"])
+@token_required
+def save_recipes(user_id):
+    try:
+        recipe_ids = parse_ids(request.get_json(silent=True), "recipe_ids")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        recipes, saved = run_concurrently(
+            lambda: supabase.table("recipe").select("id").in_("id", recipe_ids).execute(),
+            lambda: supabase.table("savedrecipe").select("recipe_id").eq("user_id", user_id).in_("recipe_id", recipe_ids).execute(),
+        )
+        existing = {str(row["id"]) for row in recipes.data}
+        already_saved = {str(row["recipe_id"]) for row in saved.data}
+
+        results = []
+        to_insert = []
+        for recipe_id in recipe_ids:
+            if str(recipe_id) not in existing:
+                status = "not_found"
+            elif str(recipe_id) in already_saved:
+                status = "already_saved"
+            else:
+                status = "saved"
+                to_insert.append({"user_id": user_id, "recipe_id": recipe_id})
+            results.append({"id": recipe_id, "status": status})
+
+        if to_insert:
+            inserted = supabase.table("savedrecipe").insert(to_insert).execute()
+            invalidate_profile(user_id)
+            for_you.invalidate_feed(user_id)
+            for row in inserted.data:
+                trending.record(row["recipe_id"], "save", row.get("created_at"))
+
+        return jsonify({"results": results, "saved": len(to_insert)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recipe_bp.route("/api/unsave_recipes", methods=["POST"])
+@token_required
+def unsave_recipes(user_id):
+    try:
+        recipe_ids = parse_ids(request.get_json(silent=True), "recipe_ids")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        removed = supabase.table("savedrecipe").delete().eq("user_id", user_id).in_("recipe_id", recipe_ids).execute()
+        if removed.data:
+            invalidate_profile(user_id)
+            for_you.invalidate_feed(user_id)
+        for row in removed.data:
+            trending.record(row["recipe_id"], "save", row.get("created_at"), count=-1)
+
+        results = item_results(recipe_ids, [row["recipe_id"] for row in removed.data], "unsaved", "not_saved")
+        return jsonify({"results": results, "unsaved": len(removed.data)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @recipe_bp.route("/api/get_save_recipe", methods=['GET'])
 @token_required
 def get_saved_recipes(user_id):
     try:
         # Step 1: Get list of saved recipe IDs by the user
-        saved_entries = supabase.table("savedrecipe").select("recipe_id").eq("user_id", user_id).execute()
+        saved_entries = supabase.table("savedrecipe").select("recipe_id").eq("user_id", user_id).order("id").execute()
         recipe_ids = [entry["recipe_id"] for entry in saved_entries.data]
-        print(recipe_ids)
 
+        normalized = request.args.get("shape") == "normalized"
         if not recipe_ids:
-            return jsonify({"recipes": []}), 200
+            return jsonify({"recipes": [], "users": {}} if normalized else {"recipes": []}), 200
 
         # Step 2: Fetch full recipe data + User info + Comments + Comment User info
-        all_recipes = []
-        for recipe_id in recipe_ids:
-            recipe = (
+        # in batches of ids, then restore the order the recipes were saved in
+        recipes_by_id = {}
+        for start in range(0, len(recipe_ids), SAVED_RECIPES_BATCH_SIZE):
+            batch = recipe_ids[start:start + SAVED_RECIPES_BATCH_SIZE]
+            recipes = (
                 supabase
                 .table("recipe")
                 .select("*, User(id, name, username), comment(*, User(id, name, username))")
-                .eq("id", recipe_id)
-                .limit(1)
+                .in_("id", batch)
                 .execute()
             )
-            if recipe.data:
-                all_recipes.append(recipe.data[0])
+            for recipe in recipes.data:
+                recipes_by_id[recipe["id"]] = recipe
+
+        all_recipes = [recipes_by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes_by_id]
 
-        print(all_recipes)
+        log_sampled("get_saved_recipes", user_id=user_id, saved=len(recipe_ids), returned=len(all_recipes))
 
-        return jsonify({"recipes": all_recipes}), 200
+        payload = {"recipes": all_recipes}
+        if normalized:
+            payload["users"] = side_load_users(all_recipes)
+        return jsonify(payload), 200
 
     except Exception as e:
         return jsonify({
@@ -237,23 +413,38 @@ def update_recipe(user_id):
         return jsonify({"error": "You are not authorized to update this recipe"}), 403
 
     image = request.files.get("image")
-    image_url = None
-
+    image_data = image_digest = None
     if image:
-        upload_result = cloudinary.uploader.upload(image, folder="recipe_images")
-        image_url = upload_result.get("secure_url")
+        try:
+            image_data, image_digest = read_upload(image)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     try:
         recipe_data = {
             "title": title,
             "ingredients": ingredients,
+            "ingredient_tags": ingredient_index.normalize_ingredients(ingredients),
             "description": description,
             "instructions": instructions,
-            "recipe_image_url": image_url,
+            "recipe_image_url": None,
             "is_ai_generated": is_ai_generated
         }
-        supabase.table("recipe").update(recipe_data).eq("id", recipe_id).execute()
-        return jsonify({"message": "Recipe updated successfully"}), 200
+        if image_data:
+            # Keep showing the current image until the new one is uploaded
+            del recipe_data["recipe_image_url"]
+        updated = supabase.table("recipe").update(recipe_data).eq("id", recipe_id).execute()
+        invalidate("recipes", f"recipe:{recipe_id}")
+        if updated.data:
+            search_index.index_recipe(updated.data[0])
+            ingredient_index.index_recipe(updated.data[0])
+            similar_recipes.index_recipe(updated.data[0])
+        if image_data:
+            submit_upload(image_data, image_digest, "recipe_images", partial(attach_recipe_image, recipe_id))
+        return jsonify({
+            "message": "Recipe updated successfully",
+            "image_status": "pending" if image_data else None
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -271,12 +462,18 @@ def delete_recipe(user_id):
     if not recipe.data:
         return jsonify({"error": "Recipe not found"}), 404
 
-    user = supabase.table("User").select("is_admin").eq("id", user_id).execute()
-    if recipe.data[0]["created_by"] != user_id and not user.data[0]["is_admin"]:
+    if recipe.data[0]["created_by"] != user_id and not is_admin(supabase, user_id):
         return jsonify({"error": "You are not authorized to delete this recipe"}), 403
 
     try:
+        # A trigger records the tombstone /api/sync hands out (see the README)
         supabase.table("recipe").delete().eq("id", recipe_id).execute()
+        invalidate("recipes", f"recipe:{recipe_id}")
+        invalidate_profile(recipe.data[0]["created_by"])
+        search_index.unindex_recipe(recipe.data[0]["id"])
+        ingredient_index.unindex_recipe(recipe.data[0]["id"])
+        similar_recipes.unindex_recipe(recipe.data[0]["id"])
+        trending.forget(recipe.data[0]["id"])
         return jsonify({"message": "Recipe deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -307,33 +504,224 @@ def report_recipe(user_id, recipe_id):
 @recipe_bp.route("/api/search_recipe", methods=["POST","GET"])
 @token_required
 def search_recipe(user_id):
-    data = request.json
+    data = request.get_json(silent=True) or request.args
     query = data.get("query")
 
     if not query:
         return redirect(url_for("recipe.get_all_recipe"))
 
     try:
-        recipes = supabase.table("recipe").select("""
+        limit = parse_page_size(data.get("limit"))
+        offset = max(0, int(data.get("offset") or 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    select = """
             *,
             User:created_by (
                 id,
                 name,
                 username
-            ),
-            comment (
-                id,
-                comment,
-                created_at,
-                user_id,
-                User (
+            ),""" + COMMENT_PREVIEW_SELECT
+
+    try:
+        if search_index.SEARCH_BACKEND == "postgres":
+            recipes = (
+                with_comment_preview(supabase.table("recipe").select(select, count="exact"))
+                .order("created_at", desc=True)
+                .range(offset, offset + limit - 1)
+                .text_search("fts", query, options={"type": "web_search", "config": "english"})
+                .execute()
+            )
+            results, total = recipes.data, recipes.count or 0
+        else:
+            recipe_ids, total = search_index.ensure_index(supabase).search(query, offset, limit)
+            results = []
+            if recipe_ids:
+                recipes = with_comment_preview(supabase.table("recipe").select(select).in_("id", recipe_ids)).execute()
+                recipes_by_id = {recipe["id"]: recipe for recipe in recipes.data}
+                results = [recipes_by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes_by_id]
+
+        next_offset = offset + limit if offset + limit < total else None
+        payload = {"recipes": flatten_comment_preview(results), "total": total, "next_offset": next_offset}
+        if data.get("shape") == "normalized":
+            payload["users"] = side_load_users(results)
+        return jsonify(payload), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recipe_bp.route("/api/recipes_by_ingredients", methods=["POST", "GET"])
+@token_required
+def recipes_by_ingredients(user_id):
+    data = request.get_json(silent=True) or request.args
+    wanted = data.get("ingredients") or []
+    if isinstance(wanted, str):
+        wanted = wanted.split(",")
+    wanted = {ingredient_index.normalize_ingredient(name) for name in wanted} - {""}
+
+    if not wanted:
+        return jsonify({"error": "At least one ingredient is required"}), 400
+
+    try:
+        limit = parse_page_size(data.get("limit"))
+        offset = max(0, int(data.get("offset") or 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    match_all = data.get("match", "any") == "all"
+
+    try:
+        page, total = ingredient_index.ensure_index(supabase).query(wanted, match_all, offset, limit)
+        results = []
+        if page:
+            recipes = supabase.table("recipe").select("""
+                *,
+                User:created_by (
                     id,
                     name,
-                    username,
-                    profile_picture_url
-                )
-            )
-        """).ilike("title", f"%{query}%").execute()
-        return jsonify({"recipes": recipes.data}), 200
+                    username
+                ),
+                comment_count:comment(count)
+            """).in_("id", [recipe_id for recipe_id, _ in page]).execute()
+            recipes_by_id = {recipe["id"]: recipe for recipe in recipes.data}
+            for recipe_id, matched in page:
+                if recipe_id in recipes_by_id:
+                    recipe = recipes_by_id[recipe_id]
+                    recipe["matched_ingredients"] = matched
+                    results.append(recipe)
+
+        next_offset = offset + limit if offset + limit < total else None
+        return jsonify({"recipes": flatten_comment_preview(results), "total": total, "next_offset": next_offset}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recipe_bp.route("/api/similar_recipes/<string:recipe_id>", methods=["GET"])
+@cached_response("recipes")
+def get_similar_recipes(recipe_id):
+    try:
+        limit = min(parse_page_size(request.args.get("limit")), similar_recipes.SIMILAR_NEIGHBORS)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+
+    try:
+        index = similar_recipes.ensure_index(supabase, wait=False)
+        if index is None:
+            # The first all-pairs pass runs in the background; don't hold a worker for it
+            response = jsonify({"error": "Similar recipes are still being computed, try again shortly"})
+            response.headers["Retry-After"] = "30"
+            return response, 503
+
+        neighbours = index.similar(recipe_id, limit)
+        if neighbours is None:
+            return jsonify({"error": "Recipe not found"}), 404
+
+        results = []
+        if neighbours:
+            recipes = supabase.table("recipe").select("""
+                *,
+                User:created_by (
+                    id,
+                    name,
+                    username
+                ),
+                comment_count:comment(count)
+            """).in_("id", [neighbour_id for neighbour_id, _ in neighbours]).execute()
+            recipes_by_id = {recipe["id"]: recipe for recipe in recipes.data}
+            for neighbour_id, score in neighbours:
+                if neighbour_id in recipes_by_id:
+                    recipe = recipes_by_id[neighbour_id]
+                    recipe["similarity"] = round(score, 4)
+                    results.append(recipe)
+
+        return jsonify({"recipes": flatten_comment_preview(results)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recipe_bp.route("/api/trending", methods=["GET"])
+@cached_response("recipes")
+def get_trending():
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        offset = max(0, int(request.args.get("offset") or 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    try:
+        ranked, total = trending.ensure_scores(supabase).top(offset, limit)
+
+        results = []
+        if ranked:
+            recipes = supabase.table("recipe").select("""
+                *,
+                User:created_by (
+                    id,
+                    name,
+                    username
+                ),
+                comment_count:comment(count)
+            """).in_("id", [recipe_id for recipe_id, _ in ranked]).execute()
+            recipes_by_id = {recipe["id"]: recipe for recipe in recipes.data}
+            for recipe_id, score in ranked:
+                if recipe_id in recipes_by_id:
+                    recipe = recipes_by_id[recipe_id]
+                    recipe["trending_score"] = round(score, 4)
+                    results.append(recipe)
+
+        next_offset = offset + limit if offset + limit < total else None
+        return jsonify({"recipes": flatten_comment_preview(results), "total": total, "next_offset": next_offset}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recipe_bp.route("/api/for_you", methods=["GET"])
+@token_required
+def get_for_you(user_id):
+    try:
+        limit = parse_page_size(request.args.get("limit"))
+        offset = max(0, int(request.args.get("offset") or 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+
+    try:
+        feed = for_you.get_feed(supabase, user_id)
+        if feed is not None and len(feed[0]):
+            source = "personalized"
+            recipe_ids, scores = feed
+            total = len(recipe_ids)
+            ranked = [(recipe_id.item(), float(score)) for recipe_id, score in
+                      zip(recipe_ids[offset:offset + limit], scores[offset:offset + limit])]
+        else:
+            # Nothing saved yet, or the similarity index is still being built
+            source = "trending"
+            ranked, total = trending.ensure_scores(supabase).top(offset, limit)
+
+        results = []
+        if ranked:
+            recipes = supabase.table("recipe").select("""
+                *,
+                User:created_by (
+                    id,
+                    name,
+                    username
+                ),
+                comment_count:comment(count)
+            """).in_("id", [recipe_id for recipe_id, _ in ranked]).execute()
+            recipes_by_id = {recipe["id"]: recipe for recipe in recipes.data}
+            for recipe_id, score in ranked:
+                if recipe_id in recipes_by_id:
+                    recipe = recipes_by_id[recipe_id]
+                    recipe["score"] = round(score, 4)
+                    results.append(recipe)
+
+        next_offset = offset + limit if offset + limit < total else None
+        return jsonify({
+            "recipes": flatten_comment_preview(results),
+            "total": total,
+            "next_offset": next_offset,
+            "source": source
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
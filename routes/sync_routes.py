@@ -0,0 +1,116 @@
+from flask import Blueprint, jsonify, request
+from utils.supabase_clients import supabase
+from utils.concurrency import run_concurrently
+from utils.pagination import check_cursor_values, decode_cursor, encode_cursor, paginate, parse_page_size
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+sync_bp = Blueprint("sync", __name__)
+
+# Rows per stream per response, so one response holds at most three times this
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "200"))
+SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", "500"))
+# Rows newer than this are left for the next sync: a transaction that commits
+# late can carry a timestamp older than rows already handed out
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+# How long tombstones are kept; clients further behind must download everything again
+SYNC_TOMBSTONE_DAYS = float(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+
+# (response key, table, columns, column the stream is ordered by)
+SYNC_STREAMS = (
+    ("recipes", "recipe", "*, User:created_by (id, name, username)", "updated_at"),
+    ("comments", "comment", "*, User (id, name, username, profile_picture_url)", "created_at"),
+    ("deleted", "recipe_tombstone", "id, recipe_id, deleted_at", "deleted_at"),
+)
+
+
+def parse_timestamp(value):
+    moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def parse_watermark():
+    """Return (since, deletes read up to, [position per stream]) from `cursor`, or from `since` on a first sync."""
+    cursor = request.args.get("cursor")
+    if cursor:
+        watermark, positions = decode_cursor(cursor)
+        if not isinstance(positions, list) or len(positions) != len(SYNC_STREAMS) or not all(
+            position is None or (isinstance(position, list) and len(position) == 2) for position in positions
+        ):
+            raise ValueError("Invalid cursor")
+        for (_, _, _, column), position in zip(SYNC_STREAMS, positions):
+            if position:
+                check_cursor_values(column, *position)
+        if isinstance(watermark, list) and len(watermark) == 2:
+            since, deletes_read = watermark
+        else:
+            # Cursors from before deletes_read was tracked hold only `since`
+            since, deletes_read = watermark, positions[-1][0] if positions[-1] else watermark
+        try:
+            parse_timestamp(since)
+            parse_timestamp(deletes_read)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        return since, deletes_read, positions
+
+    since = request.args.get("since")
+    if not since:
+        raise ValueError("since or cursor is required")
+    try:
+        since = parse_timestamp(since).isoformat(timespec="microseconds")
+        return since, since, [None] * len(SYNC_STREAMS)
+    except ValueError:
+        raise ValueError("since must be an ISO 8601 timestamp")
+
+
+def read_stream(table, columns, column, since, position, until, limit):
+    # Keyset page after the stream's last (column, id), or after `since` on the first page
+    query = supabase.table(table).select(columns).gt(column, since).lt(column, until)
+    rows, next_cursor = paginate(query, encode_cursor(position) if position else None, limit, column=column, desc=False)
+    if rows:
+        position = [rows[-1][column], rows[-1]["id"]]
+    return rows, position, next_cursor is not None
+
+
+@sync_bp.route("/api/sync", methods=["GET"])
+def sync():
+    try:
+        limit = parse_page_size(request.args.get("limit"), SYNC_PAGE_SIZE, SYNC_MAX_PAGE_SIZE)
+        since, deletes_read, positions = parse_watermark()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    now = datetime.now(timezone.utc)
+    if parse_timestamp(deletes_read) < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        # Deletes after the point the client has read to may have been pruned; a delta could miss them
+        return jsonify({"error": "Watermark is too old, download all recipes again", "resync": True}), 410
+
+    until = (now - timedelta(seconds=SYNC_SETTLE_SECONDS)).isoformat(timespec="microseconds")
+    try:
+        pages = run_concurrently(*[
+            partial(read_stream, table, columns, column, since, position, until, limit)
+            for (_, table, columns, column), position in zip(SYNC_STREAMS, positions)
+        ])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    payload = {key: rows for (key, _, _, _), (rows, _, _) in zip(SYNC_STREAMS, pages)}
+    payload["deleted"] = [row["recipe_id"] for row in payload["deleted"]]
+    # Every tombstone before `until` has been sent once the stream has no more
+    # pages; until then, those up to the last one sent
+    _, deleted_position, deleted_more = pages[-1]
+    if not deleted_more:
+        deletes_read = until
+    elif deleted_position:
+        deletes_read = deleted_position[0]
+    payload["cursor"] = encode_cursor([[since, deletes_read], [position for _, position, _ in pages]])
+    payload["has_more"] = any(more for _, _, more in pages)
+    return jsonify(payload), 200
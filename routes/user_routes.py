@@ -1,6 +1,12 @@
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, jsonify, request
+from utils.supabase_clients import supabase, supabase_admin
 from utils.token_required import token_required
-from supabase import create_client, Client
+from utils.rate_limit import rate_limited
+from utils.user_roles import invalidate_user
+from utils.profile_stats import get_profile, invalidate_profile
+from utils.uploads import submit_upload
+from utils.images import read_upload
+from functools import partial
 from dotenv import load_dotenv
 import os
 import cloudinary
@@ -9,7 +15,6 @@ import cloudinary.uploader
 load_dotenv()
 
 user_bp = Blueprint("user", __name__)
-supabase = None
 
 cloud_name = os.getenv("CLAUD_NAME")
 api_key = os.getenv("CLAUD_API_KEY")
@@ -30,33 +35,22 @@ cloudinary.config(
 # print(cloudinary.config().api_key)     # should print your API key
 # print(cloudinary.config().api_secret)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-
-@user_bp.before_app_request
-def setup_supabase():
-    global supabase
-    if not supabase:
-        supabase = current_app.supabase
+def attach_profile_picture(user_id, image_url):
+    # Runs on an upload worker once the image is stored
+    supabase.table("User").update({"profile_picture_url": image_url}).eq("id", user_id).execute()
+    invalidate_profile(user_id)
 
 
 @user_bp.route("/api/profile", methods = ['GET'])
 @token_required
 def profile(user_id):
     try:
-        user = supabase.table("User").select("*").eq("id", user_id).execute()
-        if not user.data:
+        profile = get_profile(supabase, user_id)
+        if not profile:
             return jsonify({"error": "User not found"}), 404
 
-        created_recipe = supabase.table("recipe").select("id").eq("created_by", user_id).execute() or 0
-        total_recipe = len(created_recipe.data) or 0
-
-        saved_recipe = supabase.table("savedrecipe").select("id").eq("user_id", user_id).execute() or 0
-        total_saved = len(saved_recipe.data) or 0
-
-        return jsonify({"user": user.data[0], "total_recipes": total_recipe, "total_saved": total_saved}), 200
+        return jsonify(profile), 200
     except Exception as e:
         return jsonify({"error": "Failed to retrieve user profile", "details": str(e)}), 500
 
@@ -69,33 +63,37 @@ def update_profile(user_id):
     new_password = request.form.get("new_password")
     username = request.form.get("username")
     profile_pic = request.files.get("profile_pic")
-    image_url = None
 
     if not name:
         return jsonify({"error": "Name is required"}), 400
 
+    if profile_pic:
+        try:
+            image_data, image_digest = read_upload(profile_pic)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     try:
-        # 1. Upload profile picture if provided
+        # 1. Queue the profile picture upload if provided; the row is patched when it finishes
         if profile_pic:
-            upload_result = cloudinary.uploader.upload(profile_pic, folder="profile_pics")
-            image_url = upload_result.get("secure_url")
-            supabase.table("User").update({"profile_picture_url": image_url}).eq("id", user_id).execute()
+            submit_upload(image_data, image_digest, "profile_pics", partial(attach_profile_picture, user_id))
 
         # 2. Update user in Supabase
         supabase.table("User").update({"name": name, "username": username}).eq("id", user_id).execute()
+        invalidate_user(user_id)
+        invalidate_profile(user_id)
 
         # 3. If new password provided, update it using Admin API
         if new_password:
-            admin_client: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-            res = admin_client.auth.admin.update_user_by_id(user_id, {"password": new_password})
+            res = supabase_admin.auth.admin.update_user_by_id(user_id, {"password": new_password})
             if not res.user:
                 return jsonify({"error": "Password update failed"}), 400
 
         return jsonify({
             "message": "Profile updated successfully.",
             "name": name,
-            "image_url": image_url,
+            "image_url": None,
+            "image_status": "pending" if profile_pic else None,
             "password_updated": bool(new_password)
         }), 200
 
@@ -104,6 +102,7 @@ def update_profile(user_id):
 
 
 @user_bp.route("/api/forgot_password", methods=["POST"])
+@rate_limited("forgot_password")
 def forgot_password():
     data = request.json
     email = data.get("email")
@@ -126,6 +125,7 @@ def forgot_password():
 
 @user_bp.route("/api/reset_password", methods = ['POST'])
 @token_required
+@rate_limited("reset_password", by="user")
 def reset_password(user_id):
     data = request.json
     new_password = data.get("new_password")
@@ -134,8 +134,7 @@ def reset_password(user_id):
         return jsonify({"error": "New password is required"}), 400
 
     try:
-        admin_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-        res = admin_client.auth.admin.update_user_by_id(user_id, {"password": new_password})
+        res = supabase_admin.auth.admin.update_user_by_id(user_id, {"password": new_password})
 
         if res.user:
             return jsonify({"message": "Password reset successful!"}), 200
@@ -0,0 +1,47 @@
+import os
+import time
+
+# Read when the app's modules are imported, so set before anything imports main
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service")
+os.environ["SUPABASE_JWT_SECRET"] = "test-secret"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SYNC_SETTLE_SECONDS"] = "0"
+os.environ["LOG_SAMPLE_RATE"] = "0"
+
+import jwt
+import pytest
+
+from benchmarks.fake_supabase import FakeSupabase
+from main import app as flask_app
+from utils.supabase_clients import set_client
+
+
+@pytest.fixture
+def app():
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_supabase():
+    """Install an in-memory Supabase holding the given tables as the app's client."""
+    def install(tables):
+        fake = FakeSupabase(tables)
+        set_client("anon", fake)
+        return fake
+    return install
+
+
+@pytest.fixture
+def auth():
+    """Authorization header for a token the app verifies locally."""
+    def header(user_id):
+        claims = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 600}
+        return {"Authorization": "Bearer " + jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")}
+    return header
@@ -0,0 +1,33 @@
+import uuid
+
+import pytest
+
+USERNAMES = ["a*b", "axb", "a%b", "a_b", "ab", "xa*by", "xaxby"]
+
+
+@pytest.fixture
+def admin(fake_supabase):
+    admin_id = str(uuid.uuid4())
+    users = [{"id": admin_id, "username": "zadmin", "name": "Admin", "email": "admin@example.com", "is_admin": True}]
+    users += [
+        {"id": str(uuid.uuid4()), "username": name, "name": name, "email": f"user{i}@example.com", "is_admin": False}
+        for i, name in enumerate(USERNAMES)
+    ]
+    fake_supabase({"User": users})
+    return admin_id
+
+
+def search(client, auth, admin, query, match="prefix"):
+    response = client.post("/api/search_user", json={"query": query, "match": match}, headers=auth(admin))
+    assert response.status_code == 200
+    return sorted(user["username"] for user in response.get_json()["users"])
+
+
+@pytest.mark.parametrize("query, match, expected", [
+    ("a*", "prefix", ["a*b"]),
+    ("a%", "prefix", ["a%b"]),
+    ("a_", "prefix", ["a_b"]),
+    ("a*b", "contains", ["a*b", "xa*by"]),
+])
+def test_wildcard_characters_match_literally(client, auth, admin, query, match, expected):
+    assert search(client, auth, admin, query, match) == expected
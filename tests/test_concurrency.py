@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from utils.concurrency import SingleFlight
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_followers(flight, key, fn, count):
+    outcomes = []
+
+    def follow():
+        try:
+            outcomes.append(flight.do(key, fn))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=follow) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader, results = run_followers(flight, "key", slow, 1)
+    started.wait(5)
+    followers, outcomes = run_followers(flight, "key", slow, 3)
+    wait_for(lambda: flight.coalesced == 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert results == ["result"]
+    assert outcomes == ["result"] * 3
+    assert len(calls) == 1
+
+
+def test_an_error_reaches_every_waiter():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    leader, results = run_followers(flight, "key", failing, 1)
+    started.wait(5)
+    followers, outcomes = run_followers(flight, "key", failing, 2)
+    wait_for(lambda: flight.coalesced == 2)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert all(isinstance(outcome, ValueError) for outcome in results + outcomes)
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    assert flight.do("key", lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do("key", lambda: calls.append(1) or len(calls)) == 2
+    assert flight.do("other", lambda: "other") == "other"
+    assert flight.coalesced == 0
+
+
+def test_the_leader_sees_its_own_error():
+    flight = SingleFlight()
+
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.do("key", lambda: "recovered") == "recovered"
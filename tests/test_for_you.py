@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from benchmarks.dataset import build_tables
+from utils import for_you, similar_recipes, trending
+from utils.cache import TTLCache
+from utils.similar_recipes import SimilarityIndex
+from utils.snapshot import RefreshingSnapshot
+
+from tests.test_similar_recipes import RECIPES
+
+
+@pytest.fixture
+def tables(fake_supabase, monkeypatch):
+    tables = build_tables(recipes=300, users=10, comments_per_recipe=1, saves_per_user=5)
+    fake = fake_supabase(tables)
+    # Fresh module state, so nothing built from another test's tables leaks in
+    monkeypatch.setattr(similar_recipes, "_snapshot", RefreshingSnapshot("similar recipes", similar_recipes.build_index, 3600))
+    monkeypatch.setattr(trending, "_snapshot", RefreshingSnapshot("trending scores", trending.build_scores, 3600))
+    monkeypatch.setattr(for_you, "_feeds", TTLCache(maxsize=100, ttl=3600))
+    # Only the on-request path is under test; the batch job would race it
+    monkeypatch.setattr(for_you, "_batch", RefreshingSnapshot("for you feeds", lambda supabase: 0, 3600))
+    similar_recipes.ensure_index(fake)
+    return tables
+
+
+def saved_by(tables, user_id):
+    return {row["recipe_id"] for row in tables["savedrecipe"] if row["user_id"] == user_id}
+
+
+def feed_ids(client, auth, user_id):
+    body = client.get("/api/for_you?limit=50", headers=auth(user_id)).get_json()
+    return body["source"], [recipe["id"] for recipe in body["recipes"]]
+
+
+def test_rank_leaves_out_saved_recipes_and_users_without_saves():
+    index = SimilarityIndex(dimensions=64, neighbors=3)
+    index.build(RECIPES)
+    boost = np.zeros(len(RECIPES), dtype=np.float32)
+
+    feeds = for_you.rank(index, {"curry": [1], "nobody": [], "unknown": [99]}, boost)
+
+    recipe_ids, scores = feeds["curry"]
+    assert 1 not in recipe_ids.tolist()
+    assert recipe_ids[0] == 2
+    assert list(scores) == sorted(scores, reverse=True)
+    assert len(feeds["nobody"][0]) == 0 and len(feeds["unknown"][0]) == 0
+
+
+def test_feed_is_personalized_and_leaves_out_saved_recipes(client, auth, tables):
+    user_id = tables["User"][3]["id"]
+    saved = saved_by(tables, user_id)
+
+    source, recipe_ids = feed_ids(client, auth, user_id)
+
+    assert saved and source == "personalized"
+    assert recipe_ids and not saved & set(recipe_ids)
+
+
+def test_users_without_saves_get_trending(client, auth, tables):
+    user_id = tables["User"][3]["id"]
+    tables["savedrecipe"] = [row for row in tables["savedrecipe"] if row["user_id"] != user_id]
+
+    source, recipe_ids = feed_ids(client, auth, user_id)
+
+    # Built by the request above
+    trending_ids = [recipe_id for recipe_id, _ in trending.ensure_scores(None).top(0, 50)[0]]
+    assert source == "trending"
+    assert recipe_ids == trending_ids
+
+
+def test_saving_a_recipe_recomputes_the_feed(client, auth, tables):
+    user_id = tables["User"][3]["id"]
+    _, before = feed_ids(client, auth, user_id)
+    assert for_you._feeds.get(for_you._key(user_id)) is not None
+
+    assert client.post("/api/save_recipe", json={"recipe_id": before[0]}, headers=auth(user_id)).status_code == 201
+    assert for_you._feeds.get(for_you._key(user_id)) is None
+
+    _, after = feed_ids(client, auth, user_id)
+    assert before[0] not in after
@@ -0,0 +1,27 @@
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from utils import images
+
+
+def upload(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, "PNG")
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename="photo.png")
+
+
+def test_images_within_the_limits_are_read(monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_MAX_PIXELS", 100 * 100)
+    data, digest = images.read_upload(upload(100, 100))
+    assert data.startswith(b"\x89PNG") and len(digest) == 64
+
+
+def test_images_with_too_many_pixels_are_rejected(monkeypatch):
+    # Compresses to a few hundred bytes, far under IMAGE_MAX_BYTES
+    monkeypatch.setattr(images, "IMAGE_MAX_PIXELS", 100 * 100)
+    with pytest.raises(ValueError, match="megapixels"):
+        images.read_upload(upload(101, 100))
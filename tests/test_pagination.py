@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.fake_supabase import FakeSupabase
+from utils.pagination import encode_cursor, paginate, quote
+
+USERNAMES = ['a"b', "a\\b", 'a\\"),id.gt.(0', "a,b", "ab", "a"]
+
+
+def test_quote_escapes_backslashes_and_double_quotes():
+    assert quote('say "hi"\\') == '"say \\"hi\\"\\\\"'
+    assert quote(12) == '"12"'
+
+
+def test_cursor_values_with_quotes_page_correctly():
+    fake = FakeSupabase({"User": [{"id": f"u{i}", "username": name} for i, name in enumerate(USERNAMES)]})
+    seen, cursor = [], None
+    while True:
+        rows, cursor = paginate(fake.table("User").select("id, username"), cursor, 2, column="username", desc=False)
+        seen += [row["username"] for row in rows]
+        if not cursor:
+            break
+    assert seen == sorted(USERNAMES)
+
+
+@pytest.mark.parametrize("column, values", [
+    ("username", [{"x": 1}, "u1"]),
+    ("username", [5, "u1"]),
+    ("username", ["a", [1]]),
+    ("username", ["a", True]),
+    ("created_at", ["yesterday", 1]),
+    ("created_at", [None, 1]),
+    ("created_at", ['2025-01-01T00:00:00+00:00"),id.gt.(0', 1]),
+])
+def test_malformed_cursor_values_are_rejected(column, values):
+    fake = FakeSupabase({"User": []})
+    with pytest.raises(ValueError):
+        paginate(fake.table("User").select("*"), encode_cursor(values), 2, column=column)
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import rate_limit
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake wall clock for the buckets, starting with every bucket full."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: clock.now))
+    original = rate_limit._buckets
+    rate_limit.set_rate_limit_backend(TTLCache(maxsize=100, ttl=3600))
+    yield clock
+    rate_limit.set_rate_limit_backend(original)
+
+
+def test_burst_then_refill(clock):
+    assert [rate_limit.take("key", 3, 30) for _ in range(3)] == [0, 0, 0]
+    # One token comes back every 10 seconds
+    assert rate_limit.take("key", 3, 30) == pytest.approx(10)
+
+    clock.now += 5
+    assert rate_limit.take("key", 3, 30) == pytest.approx(5)
+    clock.now += 5
+    assert rate_limit.take("key", 3, 30) == 0
+    assert rate_limit.take("key", 3, 30) == pytest.approx(10)
+
+
+def test_buckets_are_per_key(clock):
+    for _ in range(3):
+        rate_limit.take("a", 3, 30)
+    assert rate_limit.take("a", 3, 30) > 0
+    assert rate_limit.take("b", 3, 30) == 0
+
+
+def test_an_idle_bucket_refills_only_up_to_the_burst(clock):
+    rate_limit.take("key", 3, 30)
+    clock.now += 3600
+    assert [rate_limit.take("key", 3, 30) for _ in range(3)] == [0, 0, 0]
+    assert rate_limit.take("key", 3, 30) > 0
+
+
+def test_clients_are_told_when_to_retry(client, clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    burst, _ = rate_limit.parse_limit(rate_limit.LIMITS["validate_token"])
+
+    for _ in range(burst):
+        assert client.get("/api/validate_token", environ_base={"REMOTE_ADDR": "10.0.0.1"}).status_code == 401
+    limited = client.get("/api/validate_token", environ_base={"REMOTE_ADDR": "10.0.0.1"},
+                         headers={"X-Forwarded-For": "10.9.9.9"})
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+    # Buckets are keyed on the connecting address
+    assert client.get("/api/validate_token", environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code == 401
@@ -0,0 +1,60 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+from benchmarks.dataset import build_tables
+from routes.recipe_routes import side_load_users
+from utils import compression, response_cache
+from utils.cache import TTLCache
+
+DECOMPRESS = {"br": brotli.decompress, "gzip": gzip.decompress}
+
+
+@pytest.fixture
+def tables(fake_supabase, monkeypatch):
+    tables = build_tables(recipes=100, users=8, comments_per_recipe=3, saves_per_user=0)
+    fake_supabase(tables)
+    # Entries cached by other tests were built from other tables
+    monkeypatch.setattr(response_cache, "_response_cache", TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(compression, "_compressed", TTLCache(maxsize=100, ttl=60))
+    return tables
+
+
+def test_side_load_users_keeps_one_copy_of_each_user():
+    author = {"id": "a", "name": "Ann", "username": "ann"}
+    recipes = [
+        {"id": 1, "created_by": "a", "User": dict(author), "comment": [{"id": 7, "user_id": "b", "User": {"id": "b", "name": "Bo", "username": "bo"}}]},
+        {"id": 2, "created_by": "a", "User": dict(author), "comment": []},
+    ]
+
+    users = side_load_users(recipes)
+
+    assert users == {"a": author, "b": {"id": "b", "name": "Bo", "username": "bo"}}
+    assert [recipe["created_by"] for recipe in recipes] == ["a", "a"]
+    assert not any("User" in row for row in recipes + recipes[0]["comment"])
+
+
+def test_normalized_shape_moves_users_out_of_recipes_and_comments(client, tables):
+    body = client.get("/api/get_all_recipe?limit=10&include=comments&shape=normalized").get_json()
+
+    comments = [comment for recipe in body["recipes"] for comment in recipe["comment"]]
+    assert comments
+    for row, id_field in [(recipe, "created_by") for recipe in body["recipes"]] + [(comment, "user_id") for comment in comments]:
+        assert "User" not in row
+        assert body["users"][str(row[id_field])]["username"]
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_compressed_responses_get_a_weak_etag_that_still_matches(client, tables, encoding):
+    plain = client.get("/api/get_all_recipe?limit=50", headers={"Accept-Encoding": "identity"})
+    response = client.get("/api/get_all_recipe?limit=50", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["ETag"] == "W/" + plain.headers["ETag"]
+    assert json.loads(DECOMPRESS[encoding](response.data)) == plain.get_json()
+
+    again = client.get("/api/get_all_recipe?limit=50", headers={"Accept-Encoding": encoding, "If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
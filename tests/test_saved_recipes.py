@@ -0,0 +1,24 @@
+import math
+
+import pytest
+
+from benchmarks.dataset import build_tables
+from routes.recipe_routes import get_saved_recipes
+from utils.query_trace import trace_queries
+
+
+@pytest.mark.parametrize("saves", [0, 1, 100, 101, 250])
+def test_saved_recipes_are_fetched_in_batches(app, fake_supabase, auth, saves):
+    tables = build_tables(recipes=300, users=1, comments_per_recipe=1, saves_per_user=saves)
+    fake_supabase(tables)
+    user_id = tables["User"][0]["id"]
+
+    # Called inside a request context rather than through the test client, whose
+    # before_request hook would start a trace of its own
+    with app.test_request_context("/api/get_save_recipe", headers=auth(user_id)), trace_queries() as trace:
+        response, status = get_saved_recipes()
+
+    assert status == 200
+    assert [recipe["id"] for recipe in response.get_json()["recipes"]] == [row["recipe_id"] for row in tables["savedrecipe"]]
+    # One query for the saved ids, then one per 100 recipes
+    assert len(trace.queries()) == math.ceil(saves / 100) + 1
@@ -0,0 +1,61 @@
+from utils.similar_recipes import SimilarityIndex
+
+RECIPES = [
+    {"id": 1, "title": "Chicken curry", "ingredients": "chicken, curry paste, coconut milk, rice", "description": "A creamy chicken curry"},
+    {"id": 2, "title": "Thai chicken curry", "ingredients": "chicken, green curry paste, coconut milk", "description": "Quick weeknight curry"},
+    {"id": 3, "title": "Chocolate cake", "ingredients": "flour, cocoa, sugar, eggs, butter", "description": "Rich chocolate layer cake"},
+    {"id": 4, "title": "Chocolate brownies", "ingredients": "cocoa, sugar, eggs, butter, flour", "description": "Fudgy chocolate brownies"},
+    {"id": 5, "title": "Tomato soup", "ingredients": "tomatoes, onion, garlic, stock", "description": "Simple tomato soup"},
+]
+
+
+def build():
+    index = SimilarityIndex(dimensions=64, neighbors=3)
+    index.build(RECIPES)
+    return index
+
+
+def neighbour_ids(index, recipe_id):
+    return [other for other, _ in index.similar(recipe_id)]
+
+
+def test_build_finds_the_closest_recipes():
+    index = build()
+
+    assert neighbour_ids(index, 1)[0] == 2
+    assert neighbour_ids(index, 3)[0] == 4
+    assert all(0 < score <= 1 for _, score in index.similar(1))
+    assert index.similar(99) is None
+
+
+def test_add_joins_the_neighbour_lists_of_similar_recipes():
+    index = build()
+    index.add({"id": 6, "title": "Chocolate fudge cake", "ingredients": "cocoa, sugar, eggs, butter", "description": "Chocolate cake with fudge"})
+
+    assert neighbour_ids(index, 6)[0] in (3, 4)
+    assert 6 in neighbour_ids(index, 3)
+    assert 6 not in neighbour_ids(index, 5)
+    assert len(index) == 6
+
+
+def test_add_with_an_existing_id_replaces_the_recipe():
+    index = build()
+    index.add({"id": 5, "title": "Chocolate cake", "ingredients": "flour, cocoa, sugar, eggs", "description": "Another chocolate cake"})
+
+    assert neighbour_ids(index, 5)[0] in (3, 4)
+    assert 5 in neighbour_ids(index, 3)
+    assert len(index) == 5
+
+
+def test_remove_drops_the_recipe_everywhere_and_frees_its_slot():
+    index = build()
+    slot = index._slots["2"]
+    index.remove(2)
+
+    assert index.similar(2) is None
+    assert all(2 not in neighbour_ids(index, recipe_id) for recipe_id in (1, 3, 4, 5))
+    assert len(index) == 4
+
+    index.add({"id": 7, "title": "Red chicken curry", "ingredients": "chicken, red curry paste, coconut milk", "description": "Spicy curry"})
+    assert index._slots["7"] == slot
+    assert neighbour_ids(index, 1)[0] == 7
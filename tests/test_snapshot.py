@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from utils.snapshot import RefreshingSnapshot
+
+
+def test_writes_during_a_rebuild_are_replayed_onto_the_new_value():
+    release = threading.Event()
+    builds = []
+
+    def build(supabase):
+        builds.append(1)
+        if len(builds) > 1:
+            release.wait(5)
+        return {"built"}
+
+    snapshot = RefreshingSnapshot("test", build, max_age=0)
+    snapshot.get(None)
+    snapshot.get(None)  # stale: rebuilds in the background, held at release
+    snapshot.update(lambda value: value.add("written"))
+    assert "written" in snapshot.value
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while len(builds) < 2 or snapshot._building is not None:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    assert snapshot.value == {"built", "written"}
+
+
+def test_blocking_readers_share_one_build():
+    builds = []
+
+    def build(supabase):
+        builds.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    snapshot = RefreshingSnapshot("test", build, max_age=3600)
+    assert snapshot.get(None, wait=False) is None
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(snapshot.get(None))) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join(5)
+
+    assert results == ["value"] * 4
+    assert len(builds) == 1
+
+
+def test_a_failed_first_build_raises_and_is_retried():
+    outcomes = iter([RuntimeError("database down"), "value"])
+
+    def build(supabase):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    snapshot = RefreshingSnapshot("test", build, max_age=3600)
+    with pytest.raises(RuntimeError):
+        snapshot.get(None)
+    assert snapshot.get(None) == "value"
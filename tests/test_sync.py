@@ -0,0 +1,123 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.dataset import build_tables
+from utils.pagination import decode_cursor, encode_cursor
+
+STREAMS = ("recipes", "comments", "deleted")
+
+
+@pytest.fixture
+def tables(fake_supabase):
+    tables = build_tables(recipes=120, users=5, comments_per_recipe=2, saves_per_user=0)
+    fake_supabase(tables)
+    return tables
+
+
+def since(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sync_all(client, url):
+    """Follow has_more to the end; returns ({stream: ids}, final cursor, pages)."""
+    seen = {stream: [] for stream in STREAMS}
+    pages = 0
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages += 1
+        seen["recipes"] += [recipe["id"] for recipe in body["recipes"]]
+        seen["comments"] += [comment["id"] for comment in body["comments"]]
+        seen["deleted"] += body["deleted"]
+        if not body["has_more"]:
+            return seen, body["cursor"], pages
+        url = f"/api/sync?cursor={body['cursor']}&limit=7"
+
+
+def test_paging_returns_every_change_once(client, tables):
+    start = since(20)
+    seen, cursor, pages = sync_all(client, f"/api/sync?since={start}&limit=7")
+
+    cutoff = datetime.fromisoformat(start)
+    expected_recipes = [r["id"] for r in tables["recipe"] if datetime.fromisoformat(r["updated_at"]) > cutoff]
+    expected_comments = [c["id"] for c in tables["comment"] if datetime.fromisoformat(c["created_at"]) > cutoff]
+    assert sorted(seen["recipes"]) == sorted(expected_recipes)
+    assert sorted(seen["comments"]) == sorted(expected_comments)
+    assert pages > 1
+
+    # Nothing changed since: an empty delta and the same stream positions
+    body = client.get(f"/api/sync?cursor={cursor}").get_json()
+    assert [body[stream] for stream in STREAMS] == [[], [], []]
+    assert decode_cursor(body["cursor"])[1] == decode_cursor(cursor)[1]
+    assert body["has_more"] is False
+
+
+def test_cursor_picks_up_edits_comments_and_deletes(client, tables, auth):
+    _, cursor, _ = sync_all(client, f"/api/sync?since={since(1)}&limit=50")
+    edited, deleted = tables["recipe"][0], tables["recipe"][1]
+    headers = auth(edited["created_by"])
+
+    form = {"recipe_id": edited["id"], "title": "New title", "ingredients": "salt", "instructions": "Stir"}
+    assert client.put("/api/update_recipe", data=form, headers=headers).status_code == 200
+    assert client.post("/api/create_comment", json={"recipe_id": edited["id"], "content": "Nice"}, headers=headers).status_code in (200, 201)
+    assert client.post("/api/delete_recipe", json={"recipe_id": deleted["id"]}, headers=auth(deleted["created_by"])).status_code == 200
+    time.sleep(0.01)
+
+    body = client.get(f"/api/sync?cursor={cursor}").get_json()
+    assert [recipe["id"] for recipe in body["recipes"]] == [edited["id"]]
+    assert [comment["comment"] for comment in body["comments"]] == ["Nice"]
+    assert body["deleted"] == [deleted["id"]]
+
+
+def test_recipes_removed_with_their_author_are_reported_deleted(client, fake_supabase):
+    tables = build_tables(recipes=30, users=3, comments_per_recipe=0, saves_per_user=0)
+    fake = fake_supabase(tables)
+    _, cursor, _ = sync_all(client, f"/api/sync?since={since(1)}&limit=50")
+    author = tables["User"][0]["id"]
+    theirs = sorted(recipe["id"] for recipe in tables["recipe"] if recipe["created_by"] == author)
+
+    # What remove_user does; the cascade and the tombstone trigger do the rest
+    fake.table("User").delete().eq("id", author).execute()
+    time.sleep(0.01)
+
+    body = client.get(f"/api/sync?cursor={cursor}").get_json()
+    assert theirs and sorted(body["deleted"]) == theirs
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "since=yesterday",
+    "cursor=not-a-cursor",
+    "cursor=" + encode_cursor(["2025-01-01T00:00:00+00:00", [None, None]]),
+    "cursor=" + encode_cursor(["2025-01-01T00:00:00+00:00", [None, None, ["not a time", 1]]]),
+])
+def test_bad_watermarks_are_rejected(client, tables, query):
+    assert client.get(f"/api/sync?{query}").status_code == 400
+
+
+def test_watermarks_older_than_the_tombstones_need_a_full_download(client, tables):
+    response = client.get(f"/api/sync?since={since(365)}")
+    assert response.status_code == 410
+    assert response.get_json()["resync"] is True
+
+
+def test_a_client_that_keeps_syncing_is_never_sent_back_to_a_full_download(client, tables):
+    # First synced 31 days ago, last synced yesterday, nothing deleted since
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    positions = [[yesterday, 1], [yesterday, 1], None]
+    response = client.get("/api/sync?cursor=" + encode_cursor([[since(31), yesterday], positions]))
+    assert response.status_code == 200
+
+    # The cursor it gets back records that every delete up to now has been read
+    (first_synced, deletes_read), _ = decode_cursor(response.get_json()["cursor"])
+    assert first_synced == since(31)
+    assert datetime.fromisoformat(deletes_read) > datetime.now(timezone.utc) - timedelta(minutes=1)
+
+
+def test_a_client_that_stopped_syncing_must_download_again(client, tables):
+    last_read = (datetime.now(timezone.utc) - timedelta(days=31)).isoformat()
+    response = client.get("/api/sync?cursor=" + encode_cursor([[last_read, last_read], [None, None, None]]))
+    assert response.status_code == 410
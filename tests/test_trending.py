@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from utils.trending import EVENT_WEIGHTS, TrendingScores
+
+
+def ranked_ids(scores):
+    return [recipe_id for recipe_id, _ in scores.top(0, scores.size)[0]]
+
+
+def test_events_rank_recipes_by_weight():
+    scores = TrendingScores(size=5)
+    now = time.time()
+    scores.record(1, "created", now)
+    scores.record(2, "save", now)
+    scores.record(3, "comment", now)
+
+    assert ranked_ids(scores) == [2, 3, 1]
+    page, total = scores.top(offset=1, limit=1)
+    assert total == 3
+    assert page[0][0] == 3
+    assert page[0][1] == pytest.approx(EVENT_WEIGHTS["comment"], rel=1e-3)
+
+
+def test_older_events_count_less():
+    scores = TrendingScores(half_life_hours=1, size=5)
+    now = time.time()
+    scores.record(1, "save", now - 3600)
+    scores.record(2, "save", now)
+
+    current = dict(scores.top()[0])
+    assert current[1] == pytest.approx(current[2] / 2, rel=1e-3)
+
+
+def test_unsave_takes_a_save_back():
+    scores = TrendingScores(size=5)
+    now = time.time()
+    scores.record(1, "save", now)
+    scores.record(1, "save", now)
+    scores.record(2, "save", now)
+    assert ranked_ids(scores) == [1, 2]
+
+    scores.record(1, "save", now, count=-1)
+    scores.record(1, "save", now, count=-1)
+    assert ranked_ids(scores) == [2]
+
+    # Never below zero, however many unsaves arrive
+    scores.record(2, "save", now, count=-5)
+    scores.record(2, "save", now)
+    assert ranked_ids(scores) == [2]
+
+
+def test_heap_keeps_the_leaders_when_full():
+    scores = TrendingScores(size=2)
+    now = time.time()
+    for recipe_id in range(10):
+        scores.record(recipe_id, "save", now, count=recipe_id + 1)
+
+    assert ranked_ids(scores) == [9, 8]
+    assert len(scores._leaders) == scores.capacity
+
+    # A leader that loses its saves is replaced by the next candidate kept in the heap
+    scores.record(9, "save", now, count=-10)
+    assert ranked_ids(scores) == [8, 7]
+
+
+def test_forget_removes_a_recipe():
+    scores = TrendingScores(size=5)
+    now = time.time()
+    scores.record(1, "save", now)
+    scores.record(2, "comment", now)
+
+    scores.forget(1)
+    assert ranked_ids(scores) == [2]
+    assert 1 not in scores.scores
+
+
+def test_compact_keeps_current_scores_and_drops_decayed_ones():
+    scores = TrendingScores(half_life_hours=1, size=5)
+    now = time.time()
+    scores.record(1, "save", now)
+    scores.record(2, "comment", now)
+    before = scores.top()[0]
+
+    scores.compact(now + 1)
+    after = scores.top()[0]
+    assert [recipe_id for recipe_id, _ in after] == [recipe_id for recipe_id, _ in before]
+    for (_, old), (_, new) in zip(before, after):
+        assert new == pytest.approx(old, rel=1e-3)
+
+    scores.compact(now + 20 * 3600)
+    assert scores.scores == {}
+    assert ranked_ids(scores) == []
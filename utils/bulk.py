@@ -0,0 +1,32 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ids per bulk request; they travel in one `in.(...)` filter, so this also
+# keeps the PostgREST query string under URL length limits
+BULK_MAX_BATCH_SIZE = int(os.getenv("BULK_MAX_BATCH_SIZE", "100"))
+
+
+def parse_ids(data, key="ids", maximum=BULK_MAX_BATCH_SIZE):
+    """Return the de-duplicated id list under `key` in a JSON body, in request order.
+
+    Raises ValueError if it is missing, empty, not a list of ids or longer than `maximum`.
+    """
+    ids = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise ValueError(f"'{key}' must be a non-empty list")
+    if any(isinstance(i, bool) or not isinstance(i, (str, int)) or i == "" for i in ids):
+        raise ValueError(f"'{key}' must only contain ids")
+
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > maximum:
+        raise ValueError(f"At most {maximum} ids per request")
+    return ids
+
+
+def item_results(ids, done, done_status, missing_status):
+    """Per-id status list; `done` holds the ids (any type) the bulk statement affected."""
+    done = {str(i) for i in done}
+    return [{"id": i, "status": done_status if str(i) in done else missing_status} for i in ids]
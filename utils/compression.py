@@ -0,0 +1,82 @@
+import gzip
+import os
+
+import brotli
+from dotenv import load_dotenv
+from flask import request
+
+from utils.cache import TTLCache
+
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies gain less than the Content-Encoding header and CPU cost
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# 0-11; the upper levels are meant for static assets and far too slow per request
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+COMPRESS_MIMETYPES = {"application/json", "application/x-ndjson", "text/csv", "text/plain"}
+# Compressed copies of responses with an ETag (the cached public ones), so a
+# hot cached page is not recompressed on every request
+COMPRESS_CACHE_TTL = int(os.getenv("COMPRESS_CACHE_TTL", "60"))
+COMPRESS_CACHE_MAX_BYTES = int(os.getenv("COMPRESS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_compressed = TTLCache(maxsize=1024, ttl=COMPRESS_CACHE_TTL, maxweight=COMPRESS_CACHE_MAX_BYTES, weigh=len)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def negotiate():
+    """The encoding to use for this request: "br", "gzip" or None."""
+    accepted = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def init_compression(app):
+    """Compress JSON and text responses with brotli or gzip, as the client's Accept-Encoding allows.
+
+    Register after utils.metrics.init_metrics so response sizes are recorded as sent.
+    """
+
+    @app.after_request
+    def compress_response(response):
+        if not COMPRESSION_ENABLED or response.mimetype not in COMPRESS_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = negotiate()
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+
+        etag, _ = response.get_etag()
+        key = f"{etag}:{encoding}" if etag else None
+        compressed = _compressed.get(key) if key else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if key:
+                _compressed.set(key, compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # Same resource, different bytes; a weak ETag still matches If-None-Match
+            response.set_etag(etag, weak=True)
+        return response
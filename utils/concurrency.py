@@ -0,0 +1,66 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "16"))
+
+# FANOUT_WORKERS=0 runs the calls one after another on the request thread
+_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout") if FANOUT_WORKERS > 0 else None
+
+
+def run_concurrently(*calls):
+    """Run independent zero-argument callables at once and return their results in order.
+
+    Meant for independent Supabase round-trips inside one request, so the
+    request waits for the slowest call rather than the sum of all of them.
+    The calls run on pool threads, each in a copy of the caller's context,
+    so request-scoped state such as upstream call metrics follows them.
+    The first exception raised by any call is re-raised.
+    """
+    if _executor is None:
+        return [call() for call in calls]
+    futures = [_executor.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    A caller arriving while a call for its key is running waits for that call
+    and gets its result (or exception) instead of starting another. Nothing
+    is cached: once the call returns, the next caller runs it again.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
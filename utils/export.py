@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rows fetched per round-trip while streaming; bounds memory per export
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def ndjson_chunks(pages):
+    """Yield one chunk of newline-delimited JSON per page of rows."""
+    for rows in pages:
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+
+
+def csv_chunks(pages, columns=None):
+    """Yield a CSV header and then one chunk per page of rows.
+
+    Without `columns` the header comes from the keys of the first row, so an
+    empty export produces an empty body.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if columns:
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+    for rows in pages:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
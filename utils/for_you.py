@@ -0,0 +1,190 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils import similar_recipes, trending
+from utils.cache import TTLCache
+from utils.pagination import iter_pages
+from utils.snapshot import RefreshingSnapshot
+
+load_dotenv()
+
+# Share of a recipe's score from similarity to the user's saved recipes, and
+# from how it is trending (normalised so the top trending recipe counts 1)
+FOR_YOU_SIMILARITY_WEIGHT = float(os.getenv("FOR_YOU_SIMILARITY_WEIGHT", "0.8"))
+FOR_YOU_POPULARITY_WEIGHT = float(os.getenv("FOR_YOU_POPULARITY_WEIGHT", "0.2"))
+# Recipes kept per feed; the most it can be paged through
+FOR_YOU_SIZE = int(os.getenv("FOR_YOU_SIZE", "100"))
+# Most recent saves that make up a user's taste
+FOR_YOU_MAX_SAVES = int(os.getenv("FOR_YOU_MAX_SAVES", "50"))
+FOR_YOU_CACHE_TTL = int(os.getenv("FOR_YOU_CACHE_TTL", "1800"))
+FOR_YOU_CACHE_SIZE = int(os.getenv("FOR_YOU_CACHE_SIZE", "50000"))
+# Users who saved or commented this recently get their feed precomputed by
+# the batch job, which reruns every FOR_YOU_BATCH_INTERVAL seconds
+FOR_YOU_ACTIVE_DAYS = float(os.getenv("FOR_YOU_ACTIVE_DAYS", "7"))
+FOR_YOU_BATCH_INTERVAL = int(os.getenv("FOR_YOU_BATCH_INTERVAL", "900"))
+FOR_YOU_BATCH_USERS = int(os.getenv("FOR_YOU_BATCH_USERS", "50000"))
+# User ids per `in.(...)` filter when the batch reads saves; keeps the
+# PostgREST query string well under URL limits
+FOR_YOU_USERS_PER_QUERY = int(os.getenv("FOR_YOU_USERS_PER_QUERY", "100"))
+# Memory for one block of the users x recipes score matrix in the batch job
+FOR_YOU_BLOCK_BYTES = int(os.getenv("FOR_YOU_BLOCK_BYTES", str(64 * 1024 * 1024)))
+
+# user id -> (recipe ids, scores), best first; empty for users with nothing to go on
+_feeds = TTLCache(maxsize=FOR_YOU_CACHE_SIZE, ttl=FOR_YOU_CACHE_TTL)
+# user id -> when their saves last changed, so a batch started earlier doesn't
+# overwrite the feed with one computed from the old saves
+_changed = TTLCache(maxsize=FOR_YOU_CACHE_SIZE, ttl=FOR_YOU_BATCH_INTERVAL * 2)
+
+
+def set_for_you_cache_backend(backend):
+    """Replace the per-process feed cache with a shared one exposing get/set/delete."""
+    global _feeds
+    _feeds = backend
+
+
+def _key(user_id):
+    return f"for_you:{user_id}"
+
+
+def popularity(index, scores):
+    """Trending score per index slot, scaled so the top trending recipe is 1."""
+    vectors, _, _ = index.matrix()
+    boost = np.zeros(len(vectors), dtype=np.float32)
+    ranked, _ = scores.top(0, scores.size)
+    if ranked and ranked[0][1] > 0:
+        slots = index.slots([recipe_id for recipe_id, _ in ranked])
+        values = np.array([score for _, score in ranked], dtype=np.float32) / ranked[0][1]
+        known = (slots >= 0) & (slots < len(boost))
+        boost[slots[known]] = values[known]
+    return boost
+
+
+def rank(index, saved_by_user, boost, size=FOR_YOU_SIZE):
+    """{user id: (recipe ids, scores)} for each user, blending taste similarity and popularity.
+
+    A user's taste is the normalised sum of their saved recipes' vectors.
+    Users are scored in blocks of one matrix product each; saved recipes are
+    left out of their own feed. Users without an indexed save get an empty feed.
+    """
+    vectors, active, ids = index.matrix()
+    feeds = {}
+    users, tastes, saved_slots = [], [], []
+    for user_id, recipe_ids in saved_by_user.items():
+        slots = index.slots(recipe_ids)
+        slots = slots[(slots >= 0) & (slots < len(vectors))]
+        if not len(slots):
+            feeds[user_id] = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            continue
+        taste = vectors[slots].sum(axis=0)
+        norm = np.linalg.norm(taste)
+        users.append(user_id)
+        tastes.append(taste / norm if norm else taste)
+        saved_slots.append(slots)
+    if not users:
+        return feeds
+
+    count = len(vectors)
+    k = min(size, count)
+    popularity = FOR_YOU_POPULARITY_WEIGHT * boost[:count]
+    block = max(1, FOR_YOU_BLOCK_BYTES // (4 * count))
+    tastes = np.stack(tastes)
+    for start in range(0, len(users), block):
+        scores = tastes[start:start + block] @ vectors.T
+        np.maximum(scores, 0, out=scores)
+        scores *= FOR_YOU_SIMILARITY_WEIGHT
+        scores += popularity
+        scores[:, ~active] = -np.inf
+        for row, slots in enumerate(saved_slots[start:start + block]):
+            scores[row, slots] = -np.inf
+
+        top = np.argpartition(scores, -k, axis=1)[:, -k:] if k < count else np.tile(np.arange(count), (len(scores), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for row, user_id in enumerate(users[start:start + block]):
+            keep = np.isfinite(top_scores[row])
+            feeds[user_id] = (
+                np.array([ids[slot] for slot in top[row][keep]]),
+                top_scores[row][keep].astype(np.float32),
+            )
+    return feeds
+
+
+def _recent_saves(supabase, user_id):
+    saved = (
+        supabase.table("savedrecipe").select("recipe_id")
+        .eq("user_id", user_id).order("id", desc=True).limit(FOR_YOU_MAX_SAVES).execute()
+    )
+    return [row["recipe_id"] for row in saved.data]
+
+
+def active_users(supabase):
+    """Ids of users who saved or commented in the last FOR_YOU_ACTIVE_DAYS, most recent first."""
+    since = datetime.fromtimestamp(time.time() - FOR_YOU_ACTIVE_DAYS * 86400, timezone.utc).isoformat()
+    users = {}
+    for table in ("savedrecipe", "comment"):
+        for rows in iter_pages(lambda: supabase.table(table).select("id, user_id, created_at").gte("created_at", since)):
+            for row in rows:
+                users.setdefault(row["user_id"], row["created_at"])
+    return sorted(users, key=users.get, reverse=True)[:FOR_YOU_BATCH_USERS]
+
+
+def build_batch(supabase, chunk=FOR_YOU_USERS_PER_QUERY):
+    """Precompute and cache the feeds of every active user; returns how many were stored."""
+    started = time.time()
+    index = similar_recipes.ensure_index(supabase)
+    boost = popularity(index, trending.ensure_scores(supabase))
+    users = active_users(supabase)
+
+    stored = 0
+    for start in range(0, len(users), chunk):
+        batch = users[start:start + chunk]
+        saved_by_user = {user_id: [] for user_id in batch}
+        for rows in iter_pages(lambda: supabase.table("savedrecipe").select("id, user_id, recipe_id, created_at").in_("user_id", batch)):
+            for row in rows:
+                if len(saved_by_user[row["user_id"]]) < FOR_YOU_MAX_SAVES:
+                    saved_by_user[row["user_id"]].append(row["recipe_id"])
+
+        for user_id, feed in rank(index, saved_by_user, boost).items():
+            # Saves changed while this batch ran; the next request recomputes it
+            if (_changed.get(user_id) or 0) >= started:
+                continue
+            _feeds.set(_key(user_id), feed)
+            stored += 1
+    return stored
+
+
+_batch = RefreshingSnapshot("for you feeds", build_batch, FOR_YOU_BATCH_INTERVAL)
+
+
+def get_feed(supabase, user_id):
+    """(recipe ids, scores) for the user, best first, or None when personalisation is not ready yet.
+
+    An empty feed means the user has nothing to go on (no saved recipes).
+    """
+    # Starts the batch job on first use and reruns it once it is stale
+    _batch.get(supabase, wait=False)
+
+    feed = _feeds.get(_key(user_id))
+    if feed is not None:
+        return feed
+
+    # The first similarity pass runs in the background; don't hold a worker for it
+    index = similar_recipes.ensure_index(supabase, wait=False)
+    if index is None:
+        return None
+    boost = popularity(index, trending.ensure_scores(supabase))
+    feed = rank(index, {user_id: _recent_saves(supabase, user_id)}, boost)[user_id]
+    _feeds.set(_key(user_id), feed)
+    return feed
+
+
+def invalidate_feed(user_id):
+    _changed.set(user_id, time.time())
+    _feeds.delete(_key(user_id))
@@ -0,0 +1,64 @@
+import hashlib
+import io
+import os
+
+from dotenv import load_dotenv
+from PIL import Image, ImageOps
+
+load_dotenv()
+
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Width times height; a small file can still decode to a huge bitmap
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50 * 1000 * 1000)))
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_upload(file_storage):
+    """Read an uploaded image in chunks, rejecting it as soon as it passes IMAGE_MAX_BYTES.
+
+    Returns (bytes, sha256 hex digest). Raises ValueError if the file is too
+    large, has more than IMAGE_MAX_PIXELS pixels or is not an image Pillow
+    can read.
+    """
+    buffer = io.BytesIO()
+    digest = hashlib.sha256()
+    while True:
+        chunk = file_storage.stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > IMAGE_MAX_BYTES:
+            raise ValueError(f"Image must be smaller than {round(IMAGE_MAX_BYTES / 1024 / 1024, 1):g} MB")
+        buffer.write(chunk)
+        digest.update(chunk)
+
+    # Only parses the header; decoding happens later on the upload worker
+    data = buffer.getvalue()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except Exception:
+        raise ValueError("Unsupported or corrupt image")
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ValueError(f"Image must have fewer than {round(IMAGE_MAX_PIXELS / 1000 / 1000, 1):g} megapixels")
+
+    return data, digest.hexdigest()
+
+
+def preprocess(data):
+    """Downscale to IMAGE_MAX_DIMENSION and re-encode as IMAGE_FORMAT."""
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets JPEG decode straight at a reduced scale instead of full size
+        image.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+        output = io.BytesIO()
+        image.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY)
+        return output.getvalue()
@@ -0,0 +1,152 @@
+import heapq
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+
+from utils.pagination import iter_pages
+from utils.snapshot import RefreshingSnapshot
+
+load_dotenv()
+
+INGREDIENT_INDEX_MAX_AGE = int(os.getenv("INGREDIENT_INDEX_MAX_AGE", "300"))
+
+UNITS = {
+    "cup", "cups", "c", "tbsp", "tablespoon", "tablespoons", "tbs", "tsp", "teaspoon",
+    "teaspoons", "g", "gram", "grams", "kg", "mg", "ml", "l", "litre", "liter", "litres",
+    "liters", "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "pinch", "dash",
+    "handful", "clove", "cloves", "slice", "slices", "can", "cans", "tin", "tins", "pack",
+    "packet", "bunch", "sprig", "sprigs", "stick", "sticks", "piece", "pieces", "drop", "drops",
+}
+
+DESCRIPTORS = {
+    "chopped", "minced", "diced", "sliced", "grated", "shredded", "crushed", "ground",
+    "fresh", "freshly", "dried", "frozen", "large", "small", "medium", "finely", "roughly",
+    "thinly", "peeled", "boiled", "cooked", "raw", "ripe", "optional", "to", "taste",
+    "of", "a", "an", "some", "few", "about", "approx", "whole", "halved", "cubed",
+}
+
+# Keep words whose trailing "s" is not a plural
+SINGULAR_EXCEPTIONS = {"asparagus", "couscous", "hummus", "molasses", "swiss", "citrus", "bass", "grass"}
+
+SEPARATORS_RE = re.compile(r"[\n,;•]+|\band\b")
+PARENTHESES_RE = re.compile(r"\([^)]*\)")
+WORD_RE = re.compile(r"[a-z]+")
+
+
+def singularize(word):
+    if word in SINGULAR_EXCEPTIONS or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes") or word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text):
+    text = PARENTHESES_RE.sub(" ", text.lower())
+    words = [
+        singularize(word)
+        for word in WORD_RE.findall(text)
+        if word not in UNITS and word not in DESCRIPTORS
+    ]
+    return " ".join(words)
+
+
+def normalize_ingredients(text):
+    """Turn the free-text `ingredients` field into a sorted list of distinct ingredient names.
+
+    "2 cups chopped Tomatoes, 1 tbsp olive oil and salt" -> ["olive oil", "salt", "tomato"]
+    """
+    if not text:
+        return []
+    names = {normalize_ingredient(part) for part in SEPARATORS_RE.split(text)}
+    names.discard("")
+    return sorted(names)
+
+
+class IngredientIndex:
+    """Inverted ingredient -> recipe ids index answering "what can I cook with ..." queries."""
+
+    def __init__(self):
+        self.recipes_by_ingredient = defaultdict(set)
+        self.ingredients_by_recipe = {}
+        self._lock = threading.Lock()
+
+    def add(self, recipe_id, ingredients):
+        with self._lock:
+            self._remove(recipe_id)
+            self.ingredients_by_recipe[recipe_id] = set(ingredients)
+            for ingredient in ingredients:
+                self.recipes_by_ingredient[ingredient].add(recipe_id)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id):
+        for ingredient in self.ingredients_by_recipe.pop(recipe_id, ()):
+            recipes = self.recipes_by_ingredient[ingredient]
+            recipes.discard(recipe_id)
+            if not recipes:
+                del self.recipes_by_ingredient[ingredient]
+
+    def query(self, ingredients, match_all=False, offset=0, limit=20):
+        """Return ([(recipe_id, matched ingredients)] for the page, total matches).
+
+        Recipes using more of the given ingredients rank first; ties go to the
+        recipe needing the fewest other ingredients.
+        """
+        wanted = set(ingredients)
+        with self._lock:
+            postings = sorted((self.recipes_by_ingredient.get(name, set()) for name in wanted), key=len)
+            if not postings:
+                return [], 0
+
+            if match_all:
+                candidates = set(postings[0]).intersection(*postings[1:])
+                overlap = Counter({recipe_id: len(wanted) for recipe_id in candidates})
+            else:
+                overlap = Counter()
+                for recipes in postings:
+                    overlap.update(recipes)
+
+            ranked = heapq.nsmallest(
+                offset + limit,
+                overlap,
+                key=lambda recipe_id: (-overlap[recipe_id], len(self.ingredients_by_recipe[recipe_id]), recipe_id),
+            )
+            page = [
+                (recipe_id, sorted(self.ingredients_by_recipe[recipe_id] & wanted))
+                for recipe_id in ranked[offset:]
+            ]
+        return page, len(overlap)
+
+
+def build_index(supabase):
+    index = IngredientIndex()
+    for rows in iter_pages(lambda: supabase.table("recipe").select("id, ingredients, created_at")):
+        for row in rows:
+            index.add(row["id"], normalize_ingredients(row.get("ingredients")))
+    return index
+
+
+_snapshot = RefreshingSnapshot("ingredient index", build_index, INGREDIENT_INDEX_MAX_AGE)
+
+
+def ensure_index(supabase):
+    return _snapshot.get(supabase)
+
+
+def index_recipe(recipe):
+    ingredients = recipe.get("ingredient_tags") or normalize_ingredients(recipe.get("ingredients"))
+    _snapshot.update(lambda index: index.add(recipe["id"], ingredients))
+
+
+def unindex_recipe(recipe_id):
+    _snapshot.update(lambda index: index.remove(recipe_id))
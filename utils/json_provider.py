@@ -0,0 +1,40 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson.
+
+    Serialises large recipe lists several times faster than the standard
+    library and writes bytes straight into the response. Dates and
+    dataclasses are passed to Flask's `default`, so they come out as
+    before (HTTP dates, sorted keys). Non-ASCII text is left unescaped
+    (UTF-8), NaN and infinity become null and integers beyond 64 bits are
+    rejected. Calls that pass json.dumps keyword arguments get the default
+    encoder.
+    """
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype,
+        )
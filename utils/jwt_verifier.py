@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+
+import jwt
+from dotenv import load_dotenv
+
+from utils.cache import TTLCache
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Verified tokens are cached by hash -> user id. An entry never outlives the
+# token's own `exp` and is capped at TOKEN_CACHE_TTL, so a revoked session
+# stops being accepted from the cache within that window.
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+_jwks_client = None
+if SUPABASE_URL:
+    _jwks_client = jwt.PyJWKClient(f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json", cache_keys=True)
+
+_counters = {"local": 0, "remote": 0, "rejected": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _signing_key(token):
+    # Returns None when the token cannot be checked locally (no secret
+    # configured, unknown `kid`, JWKS unreachable) so the caller falls back
+    # to the auth service.
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg == "HS256":
+        return alg, SUPABASE_JWT_SECRET
+
+    if alg in ("RS256", "ES256") and header.get("kid") and _jwks_client:
+        try:
+            return alg, _jwks_client.get_signing_key(header["kid"]).key
+        except (jwt.PyJWKClientError, jwt.PyJWKError) as e:
+            print("JWKS lookup failed:", e)
+
+    return alg, None
+
+
+def verify_token(supabase, token):
+    """Return the user id for a Supabase access token, raising if it is invalid."""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    user_id = _token_cache.get(cache_key)
+    if user_id:
+        return user_id
+
+    try:
+        alg, key = _signing_key(token)
+        if key:
+            claims = jwt.decode(token, key, algorithms=[alg], audience=JWT_AUDIENCE)
+            user_id = claims["sub"]
+            _count("local")
+        else:
+            res = supabase.auth.get_user(token)
+            user_id = res.user.id
+            claims = jwt.decode(token, options={"verify_signature": False})
+            _count("remote")
+    except Exception:
+        _count("rejected")
+        raise
+
+    expires_in = claims.get("exp", 0) - time.time()
+    ttl = min(TOKEN_CACHE_TTL, expires_in)
+    if ttl > 0:
+        _token_cache.set(cache_key, user_id, ttl)
+
+    return user_id
+
+
+def token_cache_stats():
+    stats = _token_cache.stats()
+    with _counters_lock:
+        stats.update({f"{name}_verifications": count for name, count in _counters.items()})
+    return stats
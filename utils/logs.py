@@ -0,0 +1,22 @@
+import json
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Fraction of events written out; 1 logs everything, 0 disables
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+
+def log_sampled(event, sample_rate=None, **fields):
+    """Print `event` and `fields` as one JSON line for a random sample of calls.
+
+    Log sizes and ids rather than whole payloads.
+    """
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    print(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str), flush=True)
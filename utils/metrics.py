@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import httpx
+from dotenv import load_dotenv
+from flask import g, request
+
+from utils.logs import log_sampled
+from utils.query_trace import current_trace
+
+load_dotenv()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Time to produce a response, by route"),
+    "http_response_size_bytes": ("histogram", "Response body size, by route (streamed responses excluded)"),
+    "upstream_request_duration_seconds": ("histogram", "Duration of calls to Supabase and Cloudinary"),
+    "upstream_errors_total": ("counter", "Upstream calls that raised or returned a 5xx"),
+    "request_upstream_calls": ("histogram", "Upstream calls made while serving one request, by route"),
+    "request_upstream_seconds_total": ("counter", "Time spent waiting on upstream calls, by route"),
+    "rate_limited_total": ("counter", "Requests rejected with 429, by limit"),
+}
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        index = bisect_left(buckets, value)
+        if index < len(buckets):
+            histogram["counts"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def record_upstream(service, target, seconds, failed=False, method=None):
+    """Record one call to an external service, globally and in the current request's trace.
+
+    utils.concurrency copies the context into its workers, so fanned-out
+    calls land in the trace of the request that made them.
+    """
+    observe("upstream_request_duration_seconds", seconds, service=service, target=target)
+    if failed:
+        inc("upstream_errors_total", service=service, target=target)
+
+    trace = current_trace()
+    if trace is not None:
+        trace.add(service, target, seconds, method=method, failed=failed)
+
+
+def _classify(url):
+    # /rest/v1/<table>, /rest/v1/rpc/<fn>, /auth/v1/<endpoint>/...
+    parts = url.path.strip("/").split("/")
+    if parts[:2] == ["rest", "v1"] and len(parts) > 2:
+        return "supabase_rest", "/".join(parts[2:4]) if parts[2] == "rpc" else parts[2]
+    if parts[:2] == ["auth", "v1"] and len(parts) > 2:
+        return "supabase_auth", parts[2]
+    return "http", url.host
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """HTTP transport that times every request into the upstream metrics."""
+
+    def handle_request(self, request):
+        service, target = _classify(request.url)
+        started = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            record_upstream(service, target, time.perf_counter() - started, failed=True, method=request.method)
+            raise
+        record_upstream(service, target, time.perf_counter() - started,
+                        failed=response.status_code >= 500, method=request.method)
+        return response
+
+
+def init_metrics(app):
+    """Time every request and attribute upstream calls to the route that made them.
+
+    Upstream calls are read from the request trace, so register
+    utils.query_trace.init_query_trace first.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+
+        duration = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        observe("http_request_duration_seconds", duration,
+                endpoint=endpoint, method=request.method, status=str(response.status_code))
+
+        size = None if response.is_streamed else response.calculate_content_length()
+        if size is not None:
+            observe("http_response_size_bytes", size, SIZE_BUCKETS, endpoint=endpoint)
+
+        trace = current_trace()
+        upstream = trace.summary() if trace is not None else {}
+        for service in ("supabase_rest", "supabase_auth"):
+            calls, seconds = upstream.get(service, (0, 0.0))
+            observe("request_upstream_calls", calls, CALL_BUCKETS, endpoint=endpoint, service=service)
+            if seconds:
+                inc("request_upstream_seconds_total", seconds, endpoint=endpoint, service=service)
+
+        log_sampled(
+            "request",
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+            duration_ms=round(duration * 1000, 1),
+            bytes=size,
+            upstream={service: {"calls": calls, "ms": round(seconds * 1000, 1)} for service, (calls, seconds) in upstream.items()},
+        )
+        return response
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render(gauges=None):
+    """Prometheus text exposition of everything recorded, plus `gauges` ({name: value})."""
+    with _lock:
+        histograms = {key: {**h, "counts": list(h["counts"])} for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen and name in HELP:
+            kind, text = HELP[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+        seen.add(name)
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        header(name)
+        cumulative = 0
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for name, value in sorted((gauges or {}).items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a `limit` query parameter to [1, maximum]; raises ValueError if it is not a number."""
+    if value in (None, ""):
+        return default
+    return max(1, min(int(value), maximum))
+
+
+def parse_fields(value, allowed, required=("id",)):
+    """Turn a comma-separated `fields` parameter into a column list.
+
+    Returns ["*"] when it is empty; otherwise the `required` columns come
+    first. Raises ValueError naming any column not in `allowed`.
+    """
+    if not value:
+        return ["*"]
+    columns = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [column for column in columns if column not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys([*required, *columns]))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the two values packed into a cursor; raises ValueError if it does not decode.
+
+    Cursors are not signed, so a client can send any JSON values; check them
+    before use.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def quote(value):
+    """Quote a value for a PostgREST filter, escaping backslashes and double quotes."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def check_cursor_values(column, value, last_id):
+    # Timestamps must parse (columns named *_at), other sort keys must be text and ids a number or text
+    if column.endswith("_at"):
+        try:
+            datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    elif not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    if isinstance(last_id, bool) or not isinstance(last_id, (int, str)):
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query, cursor, limit, column="created_at", desc=True, tiebreak="id"):
+    """Run `query` as one keyset page ordered by (column, tiebreak).
+
+    Returns the rows and the cursor for the next page (None on the last page).
+    Both columns must be selected by the query.
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        check_cursor_values(column, value, last_id)
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f"{column}.{op}.{quote(value)},and({column}.eq.{quote(value)},{tiebreak}.{op}.{quote(last_id)})"
+        )
+
+    # One extra row tells us whether another page exists without a count query
+    rows = query.order(column, desc=desc).order(tiebreak, desc=desc).limit(limit + 1).execute().data
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][column], rows[-1][tiebreak]])
+
+    return rows, next_cursor
+
+
+def iter_pages(query_factory, page_size=1000, column="created_at", desc=True):
+    """Yield successive keyset pages of rows; `query_factory` must return a fresh select query each call."""
+    cursor = None
+    while True:
+        rows, cursor = paginate(query_factory(), cursor, page_size, column=column, desc=desc)
+        if rows:
+            yield rows
+        if not cursor:
+            return
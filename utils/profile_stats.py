@@ -0,0 +1,51 @@
+import os
+
+from dotenv import load_dotenv
+
+from utils.cache import TTLCache
+from utils.concurrency import run_concurrently
+
+load_dotenv()
+
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+
+_profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+def set_profile_cache_backend(backend):
+    """Replace the per-process cache with a shared one exposing get/set/delete."""
+    global _profile_cache
+    _profile_cache = backend
+
+
+def _key(user_id):
+    return f"profile:{user_id}"
+
+
+def get_profile(supabase, user_id):
+    """Return {"user", "total_recipes", "total_saved"} for a user, or None if the user does not exist."""
+    profile = _profile_cache.get(_key(user_id))
+    if profile is not None:
+        return profile
+
+    # Counts come from Content-Range on HEAD requests, so no rows are transferred
+    user, created, saved = run_concurrently(
+        lambda: supabase.table("User").select("*").eq("id", user_id).execute(),
+        lambda: supabase.table("recipe").select("id", count="exact", head=True).eq("created_by", user_id).execute(),
+        lambda: supabase.table("savedrecipe").select("id", count="exact", head=True).eq("user_id", user_id).execute(),
+    )
+    if not user.data:
+        return None
+
+    profile = {
+        "user": user.data[0],
+        "total_recipes": created.count or 0,
+        "total_saved": saved.count or 0,
+    }
+    _profile_cache.set(_key(user_id), profile)
+    return profile
+
+
+def invalidate_profile(user_id):
+    _profile_cache.delete(_key(user_id))
@@ -0,0 +1,112 @@
+import contextvars
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from flask import g, request
+
+from utils.logs import log_sampled
+
+load_dotenv()
+
+# Supabase calls one request may make before it is reported as over budget
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+# Adds X-Query-* headers with the per-request trace to every response
+QUERY_TRACE_HEADERS = os.getenv("QUERY_TRACE_HEADERS", "false").lower() == "true"
+TRACE_HEADER_MAX_CALLS = 30
+
+_current = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Upstream calls made while serving one request (or inside trace_queries())."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, service, target, seconds, method=None, failed=False):
+        with self._lock:
+            self.calls.append({
+                "service": service,
+                "target": target,
+                "method": method,
+                "ms": round(seconds * 1000, 1),
+                "failed": failed,
+            })
+
+    def queries(self):
+        return [call for call in self.calls if call["service"].startswith("supabase")]
+
+    def summary(self):
+        """{service: (calls, seconds)}"""
+        totals = {}
+        for call in self.calls:
+            count, seconds = totals.get(call["service"], (0, 0.0))
+            totals[call["service"]] = (count + 1, seconds + call["ms"] / 1000)
+        return totals
+
+    def repeated_targets(self, threshold=3):
+        """Tables hit `threshold` or more times; the usual sign of an N+1 loop."""
+        counts = Counter(call["target"] for call in self.queries())
+        return {target: count for target, count in counts.items() if count >= threshold}
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def trace_queries():
+    """Collect the upstream calls made inside the block, e.g. to assert a query count in a test."""
+    trace = RequestTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def init_query_trace(app):
+    """Start a trace for every request and report requests over QUERY_BUDGET."""
+
+    @app.before_request
+    def start_trace():
+        g.query_trace = RequestTrace()
+        g.query_trace_token = _current.set(g.query_trace)
+
+    @app.after_request
+    def check_budget(response):
+        trace = g.get("query_trace")
+        if trace is None:
+            return response
+
+        queries = trace.queries()
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        if len(queries) > QUERY_BUDGET:
+            log_sampled(
+                "query_budget_exceeded",
+                sample_rate=1,
+                endpoint=endpoint,
+                method=request.method,
+                queries=len(queries),
+                budget=QUERY_BUDGET,
+                repeated=trace.repeated_targets(),
+            )
+
+        if QUERY_TRACE_HEADERS:
+            response.headers["X-Query-Count"] = str(len(queries))
+            response.headers["X-Query-Time-Ms"] = f"{sum(call['ms'] for call in queries):.1f}"
+            response.headers["X-Query-Trace"] = ", ".join(
+                f"{call['method'] or ''} {call['target']} {call['ms']}ms".strip()
+                for call in queries[:TRACE_HEADER_MAX_CALLS]
+            )
+        return response
+
+    @app.teardown_request
+    def end_trace(error=None):
+        token = g.pop("query_trace_token", None)
+        if token is not None:
+            _current.reset(token)
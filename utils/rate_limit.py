@@ -0,0 +1,89 @@
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from dotenv import load_dotenv
+from flask import jsonify, request
+
+from utils.cache import TTLCache
+from utils.metrics import inc
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_SIZE = int(os.getenv("RATE_LIMIT_SIZE", "100000"))
+
+# "<burst>/<seconds>": up to <burst> requests at once, refilled evenly over <seconds>
+LIMITS = {
+    "login": os.getenv("RATE_LIMIT_LOGIN", "10/60"),
+    "signup": os.getenv("RATE_LIMIT_SIGNUP", "5/300"),
+    "forgot_password": os.getenv("RATE_LIMIT_FORGOT_PASSWORD", "3/300"),
+    "reset_password": os.getenv("RATE_LIMIT_RESET_PASSWORD", "5/300"),
+    "validate_token": os.getenv("RATE_LIMIT_VALIDATE_TOKEN", "60/60"),
+}
+
+# key -> (tokens left, last update). A bucket expires once it would be full
+# again, so a missing key means a full bucket.
+_buckets = TTLCache(maxsize=RATE_LIMIT_SIZE, ttl=3600)
+_lock = threading.Lock()
+
+
+def set_rate_limit_backend(backend):
+    """Replace the per-process buckets with a shared store exposing get/set(key, value, ttl)/delete.
+
+    A bucket is read and written in two steps, so with a shared store a few
+    extra requests can get through when several workers race on one key.
+    """
+    global _buckets
+    _buckets = backend
+
+
+def parse_limit(spec):
+    burst, seconds = spec.split("/")
+    return int(burst), float(seconds)
+
+
+def take(key, burst, seconds):
+    """Take a token from `key`'s bucket; returns 0 if allowed, else the seconds until one is free."""
+    rate = burst / seconds
+    # Wall-clock time, so buckets in a shared store mean the same in every process
+    now = time.time()
+    with _lock:
+        tokens, updated = _buckets.get(key) or (burst, now)
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        tokens -= 1
+        _buckets.set(key, (tokens, now), ttl=(burst - tokens) / rate)
+        return 0
+
+
+def client_ip():
+    # Behind proxies, main.py's ProxyFix (PROXY_HOPS) has already replaced this with the client's address
+    return request.remote_addr or "unknown"
+
+
+def rate_limited(name, by="ip"):
+    """Answer 429 once a client goes over LIMITS[name].
+
+    Buckets are per client IP, or with by="user" per user id; that needs the
+    decorator to sit under @token_required, which passes the id in first.
+    """
+    burst, seconds = parse_limit(LIMITS[name])
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if RATE_LIMIT_ENABLED and request.method != "OPTIONS":
+                client = args[0] if by == "user" else client_ip()
+                wait = take(f"rate:{name}:{client}", burst, seconds)
+                if wait:
+                    inc("rate_limited_total", endpoint=name)
+                    response = jsonify({"error": "Too many requests, please try again later"})
+                    response.headers["Retry-After"] = str(math.ceil(wait))
+                    return response, 429
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+from flask import current_app, request
+
+from utils.cache import TTLCache
+
+load_dotenv()
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def _weigh(value):
+    # Generation markers are plain strings; cached responses are (body, mimetype, etag)
+    return len(value[0]) if isinstance(value, tuple) else len(value)
+
+
+_response_cache = TTLCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    maxweight=RESPONSE_CACHE_MAX_BYTES,
+    weigh=_weigh,
+)
+
+
+def set_response_cache_backend(backend):
+    """Replace the per-process cache with a shared one exposing get/set/delete."""
+    global _response_cache
+    _response_cache = backend
+
+
+def _generation(namespace):
+    # Each namespace embeds a generation marker in its keys. Invalidating swaps
+    # the marker, orphaning every old entry without having to enumerate keys,
+    # which also works for shared backends. A marker lost to eviction or
+    # expiry simply behaves like an invalidation.
+    key = f"generation:{namespace}"
+    generation = _response_cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        _response_cache.set(key, generation, RESPONSE_CACHE_TTL * 10)
+    return generation
+
+
+def invalidate(*namespaces):
+    for namespace in namespaces:
+        _response_cache.set(f"generation:{namespace}", uuid.uuid4().hex, RESPONSE_CACHE_TTL * 10)
+
+
+def cached_response(namespace):
+    """Cache a view's successful responses, keyed on path and query string.
+
+    `namespace` may reference the view's URL arguments, e.g. "recipe:{recipe_id}",
+    and is what write paths pass to `invalidate`. Responses carry an ETag and
+    `If-None-Match` requests are answered with 304 without re-sending the body.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            resolved = namespace.format(**kwargs)
+            query = urlencode(sorted(request.args.items(multi=True)))
+            key = f"response:{resolved}:{_generation(resolved)}:{request.path}?{query}"
+
+            entry = _response_cache.get(key)
+            if entry is None:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                body = response.get_data()
+                entry = (body, response.mimetype, hashlib.sha1(body).hexdigest())
+                _response_cache.set(key, entry)
+
+            body, mimetype, etag = entry
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+            return response.make_conditional(request)
+        return decorated
+    return decorator
+
+
+def response_cache_stats():
+    return _response_cache.stats()
@@ -0,0 +1,153 @@
+import bisect
+import heapq
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from utils.pagination import iter_pages
+from utils.snapshot import RefreshingSnapshot
+
+load_dotenv()
+
+# "memory" ranks with the in-process index below; "postgres" delegates to a
+# tsvector column named `fts` on the recipe table (see README)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")
+# Rebuild from the database after this many seconds so writes handled by
+# other workers show up
+SEARCH_INDEX_MAX_AGE = int(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+
+FIELD_WEIGHTS = {"title": 3.0, "ingredients": 1.5, "description": 1.0}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with", "this", "that", "your", "you",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+class SearchIndex:
+    """Inverted index over recipe title, ingredients and description, ranked with BM25."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0.0
+        self._vocabulary = None
+        self._norms = None
+        self._lock = threading.RLock()
+
+    def add(self, recipe):
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(recipe.get(field)):
+                frequencies[token] += weight
+
+        with self._lock:
+            self._remove(recipe["id"])
+            self._norms = None
+            for token, frequency in frequencies.items():
+                if token not in self.postings:
+                    self._vocabulary = None
+                self.postings[token][recipe["id"]] = frequency
+            length = sum(frequencies.values())
+            self.doc_terms[recipe["id"]] = list(frequencies)
+            self.doc_lengths[recipe["id"]] = length
+            self.total_length += length
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id):
+        length = self.doc_lengths.pop(recipe_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        self._norms = None
+        for token in self.doc_terms.pop(recipe_id):
+            del self.postings[token][recipe_id]
+            if not self.postings[token]:
+                del self.postings[token]
+                self._vocabulary = None
+
+    def _expand(self, token):
+        # The last word of a query is matched as a prefix so partial input
+        # ("chick") still finds "chicken", like the old ilike search did
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, query, offset=0, limit=20):
+        """Return (recipe ids for the requested page in rank order, total number of matches)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return [], 0
+            if self._norms is None:
+                # BM25 length normalisation only changes on writes, so it is
+                # computed once per write batch instead of once per posting
+                average_length = self.total_length / doc_count or 1
+                self._norms = {
+                    recipe_id: K1 * (1 - B + B * length / average_length)
+                    for recipe_id, length in self.doc_lengths.items()
+                }
+            norms = self._norms
+
+            terms = set(tokens[:-1]) | set(self._expand(tokens[-1]))
+            scores = defaultdict(float)
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for recipe_id, frequency in docs.items():
+                    scores[recipe_id] += idf * frequency * (K1 + 1) / (frequency + norms[recipe_id])
+
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        return [recipe_id for recipe_id, _ in ranked[offset:]], len(scores)
+
+
+def build_index(supabase):
+    index = SearchIndex()
+    pages = iter_pages(lambda: supabase.table("recipe").select("id, title, ingredients, description, created_at"))
+    for rows in pages:
+        for row in rows:
+            index.add(row)
+    return index
+
+
+_snapshot = RefreshingSnapshot("search index", build_index, SEARCH_INDEX_MAX_AGE)
+
+
+def ensure_index(supabase):
+    return _snapshot.get(supabase)
+
+
+def index_recipe(recipe):
+    _snapshot.update(lambda index: index.add(recipe))
+
+
+def unindex_recipe(recipe_id):
+    _snapshot.update(lambda index: index.remove(recipe_id))
@@ -0,0 +1,404 @@
+import math
+import os
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.pagination import iter_pages
+from utils.search_index import FIELD_WEIGHTS, tokenize
+from utils.snapshot import RefreshingSnapshot
+
+load_dotenv()
+
+# Width of the recipe vectors used to shortlist candidates; more dimensions
+# shortlist more accurately at a linear cost in memory and build time
+SIMILAR_DIMENSIONS = int(os.getenv("SIMILAR_DIMENSIONS", "256"))
+# Candidates per recipe re-ranked by exact TF-IDF cosine to pick its neighbours
+SIMILAR_CANDIDATES = int(os.getenv("SIMILAR_CANDIDATES", "400"))
+# Neighbours precomputed and kept per recipe; the most a request can ask for
+SIMILAR_NEIGHBORS = int(os.getenv("SIMILAR_NEIGHBORS", "20"))
+# Neighbours scoring below this cosine similarity are not returned
+SIMILAR_MIN_SCORE = float(os.getenv("SIMILAR_MIN_SCORE", "0.1"))
+# The all-pairs pass builds the neighbour table from the database, so it is
+# rebuilt less often than the search indexes; writes in this process are
+# applied incrementally in between
+SIMILAR_INDEX_MAX_AGE = int(os.getenv("SIMILAR_INDEX_MAX_AGE", "3600"))
+# Memory for one block of the similarity matrix during the all-pairs pass
+SIMILAR_BLOCK_BYTES = int(os.getenv("SIMILAR_BLOCK_BYTES", str(64 * 1024 * 1024)))
+
+
+class SimilarityIndex:
+    """Precomputed "more like this" neighbours for every recipe.
+
+    Recipes become TF-IDF weighted bags of words over title, ingredients and
+    description (weighted like the search index). Each word maps to a fixed
+    pseudo-random direction, so a recipe's vector is the weighted sum of its
+    words' directions, normalised. Dot products of these random projections
+    approximate the cosine similarity of the sparse TF-IDF vectors, which is
+    good for a shortlist but not for the final order: the best `candidates`
+    by projection are re-ranked by exact cosine of the sparse vectors, kept
+    per slot in one flat pool of (term column, weight) pairs.
+
+    `build()` computes every recipe's top neighbours in blocked matrix
+    products. `add()` and `remove()` keep them current with one
+    matrix-vector product per write, and `similar()` is a lookup.
+    """
+
+    def __init__(self, dimensions=SIMILAR_DIMENSIONS, neighbors=SIMILAR_NEIGHBORS, candidates=SIMILAR_CANDIDATES):
+        self.dimensions = dimensions
+        self.k = neighbors
+        self.candidates = max(candidates, neighbors)
+        self.idf = {}
+        self.default_idf = 1.0
+        self._directions = {}
+        self._columns = {}
+        self._slots = {}
+        self._free = []
+        self._size = 0
+        self.ids = []
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.active = np.zeros(0, dtype=bool)
+        self.neighbors = np.full((0, neighbors), -1, dtype=np.int32)
+        self.scores = np.full((0, neighbors), -np.inf, dtype=np.float32)
+        # Sparse TF-IDF vectors: slot s owns terms/weights[starts[s]:starts[s] + lengths[s]],
+        # sorted by column. Replaced and removed entries stay behind until the next build
+        self._terms = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._used = 0
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0, dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def _direction(self, term):
+        direction = self._directions.get(term)
+        if direction is None:
+            # Seeded by the term, so a word gets the same direction in every process and rebuild
+            rng = np.random.default_rng(zlib.crc32(term.encode()))
+            direction = (rng.standard_normal(self.dimensions) / math.sqrt(self.dimensions)).astype(np.float32)
+            self._directions[term] = direction
+        return direction
+
+    @staticmethod
+    def _frequencies(recipe):
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(recipe.get(field)):
+                frequencies[token] += weight
+        return frequencies
+
+    def _vector(self, frequencies):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term, frequency in frequencies.items():
+            vector += (1 + math.log(frequency)) * self.idf.get(term, self.default_idf) * self._direction(term)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _sparse(self, frequencies):
+        # (columns, weights) of the normalised TF-IDF vector; call under the lock, it assigns columns
+        entries = sorted(
+            (self._columns.setdefault(term, len(self._columns)), (1 + math.log(frequency)) * self.idf.get(term, self.default_idf))
+            for term, frequency in frequencies.items()
+        )
+        columns = np.array([column for column, _ in entries], dtype=np.int32)
+        weights = np.array([weight for _, weight in entries], dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        return columns, weights / norm if norm else weights
+
+    def _store_sparse(self, slot, columns, weights):
+        end = self._used + len(columns)
+        if end > len(self._terms):
+            extra = max(end, len(self._terms) * 2, 1024) - len(self._terms)
+            self._terms = np.concatenate([self._terms, np.zeros(extra, dtype=np.int32)])
+            self._weights = np.concatenate([self._weights, np.zeros(extra, dtype=np.float32)])
+        self._terms[self._used:end] = columns
+        self._weights[self._used:end] = weights
+        self._starts[slot] = self._used
+        self._lengths[slot] = len(columns)
+        self._used = end
+
+    def _entries(self, slots, include=None):
+        """Pool positions of every term of `slots` in order, and the index into `slots` each belongs to."""
+        lengths = self._lengths[slots]
+        if include is not None:
+            lengths = np.where(include, lengths, 0)
+        owners = np.repeat(np.arange(len(slots)), lengths)
+        offsets = np.repeat(self._starts[slots] - (np.cumsum(lengths) - lengths), lengths)
+        return offsets + np.arange(len(owners)), owners
+
+    def _exact(self, rows, candidates):
+        """Exact cosine between each of `rows` and its row of `candidates` (slots, -1 for none)."""
+        exact = np.full(candidates.shape, -np.inf, dtype=np.float32)
+        width = max(1, len(self._columns))
+        terms = max(1, int(self._lengths[:self._size].mean())) if self._size else 1
+        # Each candidate pair expands to one entry per candidate term
+        block = max(1, SIMILAR_BLOCK_BYTES // (32 * candidates.shape[1] * terms))
+
+        for start in range(0, len(rows), block):
+            batch = candidates[start:start + block]
+            # The rows' terms as one sorted key array: row position * width + column
+            positions, owners = self._entries(rows[start:start + block])
+            row_keys = owners * width + self._terms[positions]
+            row_weights = self._weights[positions]
+            if not len(row_keys):
+                continue
+
+            flat = batch.ravel()
+            valid = flat >= 0
+            positions, pairs = self._entries(flat, valid)
+            keys = (pairs // batch.shape[1]) * width + self._terms[positions]
+            found = np.minimum(np.searchsorted(row_keys, keys), len(row_keys) - 1)
+            shared = row_keys[found] == keys
+            dots = np.bincount(
+                pairs[shared], weights=row_weights[found[shared]] * self._weights[positions[shared]], minlength=len(flat)
+            )
+            exact[start:start + block] = np.where(valid, dots, -np.inf).reshape(batch.shape)
+        return exact
+
+    def _grow(self, size):
+        capacity = len(self.active)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 64)
+        extra = capacity - len(self.active)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, self.dimensions), dtype=np.float32)])
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+        self.neighbors = np.vstack([self.neighbors, np.full((extra, self.k), -1, dtype=np.int32)])
+        self.scores = np.vstack([self.scores, np.full((extra, self.k), -np.inf, dtype=np.float32)])
+        self._starts = np.concatenate([self._starts, np.zeros(extra, dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.zeros(extra, dtype=np.int64)])
+        self.ids.extend([None] * extra)
+
+    def build(self, recipes):
+        """Replace the contents with `recipes` and compute all neighbours in one pass."""
+        frequencies = [(recipe["id"], self._frequencies(recipe)) for recipe in recipes]
+        document_frequency = defaultdict(int)
+        for _, terms in frequencies:
+            for term in terms:
+                document_frequency[term] += 1
+
+        count = len(frequencies)
+        with self._lock:
+            self.idf = {term: math.log((1 + count) / (1 + df)) + 1 for term, df in document_frequency.items()}
+            # Words first seen after the build are treated as the rarest kind
+            self.default_idf = math.log(1 + count) + 1
+            self._columns = {term: column for column, term in enumerate(self.idf)}
+            self._slots = {}
+            self._free = []
+            self._size = 0
+            self.ids = []
+            self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+            self.active = np.zeros(0, dtype=bool)
+            self.neighbors = np.full((0, self.k), -1, dtype=np.int32)
+            self.scores = np.full((0, self.k), -np.inf, dtype=np.float32)
+            self._terms = np.zeros(0, dtype=np.int32)
+            self._weights = np.zeros(0, dtype=np.float32)
+            self._used = 0
+            self._starts = np.zeros(0, dtype=np.int64)
+            self._lengths = np.zeros(0, dtype=np.int64)
+            self._grow(count)
+
+            self._embed_all(frequencies)
+            for slot, (recipe_id, _) in enumerate(frequencies):
+                self.ids[slot] = recipe_id
+                self._slots[str(recipe_id)] = slot
+            self.active[:count] = True
+            self._size = count
+            self._recompute(np.arange(count))
+
+    def _embed_all(self, frequencies, chunk=2048):
+        # Same result as _vector() and _sparse() per recipe, as one gather and segmented sum per chunk
+        vocabulary = list(self.idf)
+        if not vocabulary:
+            return
+        column = self._columns
+        directions = np.stack([self._direction(term) for term in vocabulary])
+        idf = np.array([self.idf[term] for term in vocabulary], dtype=np.float32)
+
+        for start in range(0, len(frequencies), chunk):
+            columns, weights, owners = [], [], []
+            for slot, (_, terms) in enumerate(frequencies[start:start + chunk], start):
+                for term, frequency in terms.items():
+                    columns.append(column[term])
+                    weights.append(1 + math.log(frequency))
+                    owners.append(slot)
+            if not columns:
+                continue
+            columns = np.array(columns, dtype=np.int32)
+            owners = np.array(owners)
+            weights = np.array(weights, dtype=np.float32) * idf[columns]
+            contributions = directions[columns] * weights[:, None]
+            slots, starts = np.unique(owners, return_index=True)
+            self.vectors[slots] = np.add.reduceat(contributions, starts)
+
+            order = np.lexsort((columns, owners))
+            owners, columns, weights = owners[order], columns[order], weights[order]
+            norms = np.sqrt(np.bincount(owners - start, weights=weights.astype(np.float64) ** 2))
+            weights /= norms[owners - start].astype(np.float32)
+            slots, starts, lengths = np.unique(owners, return_index=True, return_counts=True)
+            self._terms = np.concatenate([self._terms[:self._used], columns])
+            self._weights = np.concatenate([self._weights[:self._used], weights])
+            self._starts[slots] = self._used + starts
+            self._lengths[slots] = lengths
+            self._used += len(columns)
+
+        vectors = self.vectors[:len(frequencies)]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    @staticmethod
+    def _top(scores, k):
+        # Columns of the k largest scores per row, best first
+        size = scores.shape[1]
+        k = min(k, size)
+        if k < size:
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        else:
+            top = np.tile(np.arange(size), (len(scores), 1))
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def _shortlist(self, rows, similarity):
+        """(candidate slots, exact cosine) for `rows` from their projected `similarity` to every slot.
+
+        Excluded slots must already be at -inf in `similarity`.
+        """
+        candidates = self._top(similarity, self.candidates)
+        candidates = np.where(np.isfinite(np.take_along_axis(similarity, candidates, axis=1)), candidates, -1)
+        return candidates, self._exact(rows, candidates)
+
+    def _store_top(self, rows, candidates, exact):
+        top = self._top(exact, self.k)
+        k = top.shape[1]
+        top_scores = np.take_along_axis(exact, top, axis=1)
+        self.neighbors[rows] = -1
+        self.scores[rows] = -np.inf
+        self.neighbors[rows, :k] = np.where(np.isfinite(top_scores), np.take_along_axis(candidates, top, axis=1), -1)
+        self.scores[rows, :k] = top_scores
+
+    def _recompute(self, rows):
+        """Recompute the neighbour lists of `rows` against every active recipe, in blocks."""
+        size = self._size
+        if not size or not len(rows):
+            return
+        candidates = self.vectors[:size].T
+        inactive = ~self.active[:size]
+        block = max(1, SIMILAR_BLOCK_BYTES // (4 * size))
+
+        for start in range(0, len(rows), block):
+            batch = rows[start:start + block]
+            similarity = self.vectors[batch] @ candidates
+            similarity[:, inactive] = -np.inf
+            similarity[np.arange(len(batch)), batch] = -np.inf
+            self._store_top(batch, *self._shortlist(batch, similarity))
+
+    def add(self, recipe):
+        """Insert or update one recipe and fold it into the other recipes' neighbour lists."""
+        frequencies = self._frequencies(recipe)
+        vector = self._vector(frequencies)
+        with self._lock:
+            if str(recipe["id"]) in self._slots:
+                self._remove(recipe["id"])
+
+            slot = self._free.pop() if self._free else self._size
+            self._grow(slot + 1)
+            self._size = max(self._size, slot + 1)
+            self.vectors[slot] = vector
+            self._store_sparse(slot, *self._sparse(frequencies))
+            self.active[slot] = True
+            self.ids[slot] = recipe["id"]
+            self._slots[str(recipe["id"])] = slot
+
+            similarity = self.vectors[:self._size] @ vector
+            similarity[~self.active[:self._size]] = -np.inf
+            similarity[slot] = -np.inf
+            rows = np.array([slot])
+            candidates, exact = self._shortlist(rows, similarity[None, :])
+            self._store_top(rows, candidates, exact)
+
+            # The new recipe displaces the weakest neighbour of every candidate it beats
+            for row, score in zip(candidates[0], exact[0]):
+                if row < 0 or score <= self.scores[row, -1]:
+                    continue
+                position = int(np.searchsorted(-self.scores[row], -score))
+                self.scores[row, position + 1:] = self.scores[row, position:-1]
+                self.neighbors[row, position + 1:] = self.neighbors[row, position:-1]
+                self.scores[row, position] = score
+                self.neighbors[row, position] = slot
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id):
+        slot = self._slots.pop(str(recipe_id), None)
+        if slot is None:
+            return
+        self.active[slot] = False
+        self.vectors[slot] = 0
+        self.ids[slot] = None
+        self.neighbors[slot] = -1
+        self.scores[slot] = -np.inf
+        self._lengths[slot] = 0
+        # Recipes that listed it get a fresh list, so the slot can be reused safely
+        affected = np.nonzero((self.neighbors[:self._size] == slot).any(axis=1))[0]
+        self._recompute(affected)
+        self._free.append(slot)
+
+    def similar(self, recipe_id, limit=SIMILAR_NEIGHBORS, min_score=SIMILAR_MIN_SCORE):
+        """[(recipe id, similarity)] most similar first, or None if the recipe is not indexed."""
+        with self._lock:
+            slot = self._slots.get(str(recipe_id))
+            if slot is None:
+                return None
+            return [
+                (self.ids[neighbor], float(score))
+                for neighbor, score in zip(self.neighbors[slot, :limit], self.scores[slot, :limit])
+                if neighbor >= 0 and score >= min_score
+            ]
+
+    def slots(self, recipe_ids):
+        """Slot of each of `recipe_ids`, -1 for recipes that are not indexed."""
+        with self._lock:
+            return np.array([self._slots.get(str(recipe_id), -1) for recipe_id in recipe_ids], dtype=np.int64)
+
+    def matrix(self):
+        """(vectors, active mask, ids) of the occupied slots, for scoring other vectors against."""
+        with self._lock:
+            size = self._size
+            return self.vectors[:size], self.active[:size], self.ids[:size]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def nbytes(self):
+        return (
+            self.vectors.nbytes + self.neighbors.nbytes + self.scores.nbytes + self.active.nbytes
+            + self._terms.nbytes + self._weights.nbytes + self._starts.nbytes + self._lengths.nbytes
+        )
+
+
+def build_index(supabase):
+    recipes = []
+    for rows in iter_pages(lambda: supabase.table("recipe").select("id, title, ingredients, description, created_at")):
+        recipes.extend(rows)
+    index = SimilarityIndex()
+    index.build(recipes)
+    return index
+
+
+_snapshot = RefreshingSnapshot("similar recipes", build_index, SIMILAR_INDEX_MAX_AGE)
+
+
+def ensure_index(supabase, wait=True):
+    return _snapshot.get(supabase, wait=wait)
+
+
+def index_recipe(recipe):
+    _snapshot.update(lambda index: index.add(recipe))
+
+
+def unindex_recipe(recipe_id):
+    _snapshot.update(lambda index: index.remove(recipe_id))
@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class RefreshingSnapshot:
+    """An in-memory structure derived from the database.
+
+    `build(supabase)` runs on first use, blocking that request. Once the value
+    is older than `max_age` seconds it is rebuilt on a background thread while
+    readers keep using the previous one, so writes handled by other workers
+    eventually show up in every process. Only one build runs at a time;
+    blocking readers that arrive during it wait for its result.
+
+    Writes made in this process go through `update()`. Those arriving during
+    a build are replayed onto the new value before it replaces the old one,
+    since the build may have read the table before they happened.
+    """
+
+    def __init__(self, name, build, max_age):
+        self.name = name
+        self.build = build
+        self.max_age = max_age
+        self.value = None
+        self.built_at = None
+        # Guards _building, _pending and the swap to a new value
+        self._lock = threading.Lock()
+        # Set when the build in progress finishes; None when none is running
+        self._building = None
+        self._pending = []
+
+    def get(self, supabase, wait=True):
+        """The current value. With wait=False a missing value is built in the background and None returned."""
+        value = self.value
+        if value is None and wait:
+            while self.value is None:
+                building, owner = self._begin()
+                if owner:
+                    self._build(supabase, building)
+                else:
+                    building.wait()
+            return self.value
+        if value is None or time.monotonic() - self.built_at > self.max_age:
+            self._start_refresh(supabase)
+        return value
+
+    def peek(self):
+        """The current value, or None if it has not been built yet."""
+        return self.value
+
+    def update(self, write):
+        """Apply `write(value)` to the current value and to any build in progress."""
+        with self._lock:
+            if self._building is not None:
+                self._pending.append(write)
+            value = self.value
+        if value is not None:
+            write(value)
+
+    def _store(self, value):
+        self.value = value
+        self.built_at = time.monotonic()
+
+    def _begin(self):
+        # Returns (event set when the current build finishes, whether the caller runs it)
+        with self._lock:
+            if self._building is not None:
+                return self._building, False
+            self._building = threading.Event()
+            return self._building, True
+
+    def _build(self, supabase, building):
+        try:
+            value = self.build(supabase)
+            with self._lock:
+                for write in self._pending:
+                    write(value)
+                self._store(value)
+        finally:
+            with self._lock:
+                self._pending = []
+                self._building = None
+            building.set()
+
+    def _start_refresh(self, supabase):
+        building, owner = self._begin()
+        if owner:
+            threading.Thread(target=self._refresh, args=(supabase, building), daemon=True).start()
+
+    def _refresh(self, supabase, building):
+        try:
+            self._build(supabase, building)
+        except Exception as e:
+            print(f"Refreshing {self.name} failed:", e)
@@ -0,0 +1,82 @@
+import os
+import threading
+from functools import partial
+
+import httpx
+from dotenv import load_dotenv
+from supabase import ClientOptions, create_client
+from werkzeug.local import LocalProxy
+
+from utils.metrics import InstrumentedTransport
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+
+ROLE_KEYS = {
+    "anon": os.getenv("SUPABASE_ANON_KEY"),
+    "service": os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _build(role):
+    key = ROLE_KEYS.get(role)
+    if not key:
+        raise RuntimeError(f"No Supabase key configured for role '{role}'")
+
+    # One pool per role: postgrest writes the role's apikey/Authorization
+    # headers onto the httpx client, so roles cannot share one
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+        transport=InstrumentedTransport(limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        )),
+        follow_redirects=True,
+    )
+    if role == "service":
+        # Only used for the auth admin API; it never signs anyone in
+        options = ClientOptions(httpx_client=http_client, auto_refresh_token=False, persist_session=False)
+    else:
+        options = ClientOptions(httpx_client=http_client)
+    return create_client(SUPABASE_URL, key, options=options)
+
+
+def get_client(role="anon"):
+    """Return the shared client for `role` ("anon" or "service"), creating it on first use."""
+    client = _clients.get(role)
+    if client is None:
+        with _lock:
+            client = _clients.get(role)
+            if client is None:
+                client = _clients[role] = _build(role)
+    return client
+
+
+def set_client(role, client):
+    """Replace the client for a role, e.g. with a fake in benchmarks."""
+    with _lock:
+        _clients[role] = client
+
+
+def init_clients(app):
+    """Create every configured client at startup and attach them to the app."""
+    for role, key in ROLE_KEYS.items():
+        if key:
+            get_client(role)
+    app.supabase = supabase
+    app.supabase_admin = supabase_admin
+
+
+# Import these instead of holding a client per module; they resolve to the
+# registry on every access, so swapping a client with set_client() is seen everywhere
+supabase = LocalProxy(partial(get_client, "anon"))
+supabase_admin = LocalProxy(partial(get_client, "service"))
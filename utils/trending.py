@@ -0,0 +1,192 @@
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from utils.pagination import iter_pages
+from utils.snapshot import RefreshingSnapshot
+
+load_dotenv()
+
+# Time for an event's contribution to a recipe's score to halve
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "48"))
+# What each kind of event adds to a recipe's score when it happens
+EVENT_WEIGHTS = {
+    "save": float(os.getenv("TRENDING_SAVE_WEIGHT", "3")),
+    "comment": float(os.getenv("TRENDING_COMMENT_WEIGHT", "2")),
+    "created": float(os.getenv("TRENDING_CREATED_WEIGHT", "1")),
+}
+# Recipes ranked in the feed; the most it can be paged through
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "200"))
+# History loaded when scores are rebuilt from the database
+TRENDING_WINDOW_DAYS = float(os.getenv("TRENDING_WINDOW_DAYS", "14"))
+# Scores are rebuilt from the database this often so events handled by other
+# workers count; this process's own events are applied as they happen
+TRENDING_MAX_AGE = int(os.getenv("TRENDING_MAX_AGE", "3600"))
+TRENDING_COMPACT_INTERVAL = int(os.getenv("TRENDING_COMPACT_INTERVAL", "600"))
+# Decayed scores below this are dropped at compaction
+TRENDING_MIN_SCORE = float(os.getenv("TRENDING_MIN_SCORE", "0.01"))
+
+
+def parse_time(value):
+    """Unix time of a Supabase timestamp (None for now)."""
+    if not value:
+        return time.time()
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class TrendingScores:
+    """Time-decayed popularity per recipe, with the leaders kept ranked.
+
+    Scores are stored relative to `epoch`: an event of weight w at time t adds
+    w * 2 ** ((t - epoch) / half_life). Every score then decays by the same
+    factor as time passes, so stored values never need touching and their
+    order is the current ranking. compact() moves the epoch forward to keep
+    the numbers small, drops scores that have decayed away and rebuilds the
+    leader heap exactly.
+
+    The heap keeps twice `size` candidates, so a leader that loses points
+    (an unsave) rarely leaves a gap that only a full scan could fill.
+    """
+
+    def __init__(self, half_life_hours=TRENDING_HALF_LIFE_HOURS, size=TRENDING_SIZE):
+        self.half_life = half_life_hours * 3600
+        self.size = size
+        self.capacity = size * 2
+        self.epoch = time.time()
+        self.scores = {}
+        self.compacted_at = time.monotonic()
+        self._leaders = {}
+        self._heap = []
+        self._ranked = None
+        self._compacting = False
+        self._lock = threading.Lock()
+
+    def record(self, recipe_id, kind, at=None, count=1):
+        """Count `count` events of `kind` (EVENT_WEIGHTS) at unix time `at`; count=-1 undoes one."""
+        at = time.time() if at is None else at
+        with self._lock:
+            delta = count * EVENT_WEIGHTS[kind] * 2 ** ((at - self.epoch) / self.half_life)
+            score = max(0.0, self.scores.get(recipe_id, 0.0) + delta)
+            self.scores[recipe_id] = score
+            self._offer(recipe_id, score)
+
+    def forget(self, recipe_id):
+        with self._lock:
+            self.scores.pop(recipe_id, None)
+            if self._leaders.pop(recipe_id, None) is not None:
+                self._ranked = None
+
+    def _offer(self, recipe_id, score):
+        if recipe_id not in self._leaders:
+            if len(self._leaders) >= self.capacity and score <= self._weakest():
+                return
+        self._leaders[recipe_id] = score
+        heapq.heappush(self._heap, (score, recipe_id))
+        self._ranked = None
+
+        if len(self._leaders) > self.capacity:
+            self._weakest()
+            _, evicted = heapq.heappop(self._heap)
+            del self._leaders[evicted]
+        if len(self._heap) > 4 * self.capacity:
+            # Updates leave superseded entries behind; drop them
+            self._heap = [(score, leader) for leader, score in self._leaders.items()]
+            heapq.heapify(self._heap)
+
+    def _weakest(self):
+        # Discards heap entries superseded by a later update or a forget()
+        while self._heap and self._leaders.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else 0.0
+
+    def top(self, offset=0, limit=20):
+        """Return ([(recipe id, current score)] for the page, number of ranked recipes)."""
+        with self._lock:
+            if self._ranked is None:
+                ranked = sorted(self._leaders.items(), key=lambda item: item[1], reverse=True)
+                self._ranked = [item for item in ranked[:self.size] if item[1] > 0]
+            ranked = self._ranked
+            decay = 2 ** ((self.epoch - time.time()) / self.half_life)
+        return [(recipe_id, score * decay) for recipe_id, score in ranked[offset:offset + limit]], len(ranked)
+
+    def compact(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            decay = 2 ** ((self.epoch - now) / self.half_life)
+            self.epoch = now
+            self.scores = {
+                recipe_id: score * decay
+                for recipe_id, score in self.scores.items()
+                if score * decay >= TRENDING_MIN_SCORE
+            }
+            leaders = heapq.nlargest(self.capacity, self.scores.items(), key=lambda item: item[1])
+            self._leaders = dict(leaders)
+            self._heap = [(score, recipe_id) for recipe_id, score in leaders]
+            heapq.heapify(self._heap)
+            self._ranked = None
+            self.compacted_at = time.monotonic()
+
+    def maybe_compact(self):
+        """Start a background compaction if the last one is older than TRENDING_COMPACT_INTERVAL."""
+        if self._compacting or time.monotonic() - self.compacted_at < TRENDING_COMPACT_INTERVAL:
+            return
+        self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print("Compacting trending scores failed:", e)
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def build_scores(supabase):
+    scores = TrendingScores()
+    now = time.time()
+    since = datetime.fromtimestamp(now - TRENDING_WINDOW_DAYS * 86400, timezone.utc).isoformat()
+    # Events from here on are replayed onto the result by RefreshingSnapshot,
+    # so reading them from the tables as well would count them twice
+    until = datetime.fromtimestamp(now, timezone.utc).isoformat()
+
+    def recent(table, columns):
+        return iter_pages(lambda: supabase.table(table).select(columns).gte("created_at", since).lt("created_at", until))
+
+    for rows in recent("recipe", "id, created_at"):
+        for row in rows:
+            scores.record(row["id"], "created", parse_time(row["created_at"]))
+    for table, kind in (("savedrecipe", "save"), ("comment", "comment")):
+        for rows in recent(table, "id, recipe_id, created_at"):
+            for row in rows:
+                scores.record(row["recipe_id"], kind, parse_time(row["created_at"]))
+
+    scores.compact()
+    return scores
+
+
+_snapshot = RefreshingSnapshot("trending scores", build_scores, TRENDING_MAX_AGE)
+
+
+def ensure_scores(supabase):
+    scores = _snapshot.get(supabase)
+    scores.maybe_compact()
+    return scores
+
+
+def record(recipe_id, kind, created_at=None, count=1):
+    """Apply an event to the live scores; a no-op until they have been built."""
+    at = parse_time(created_at)
+    _snapshot.update(lambda scores: scores.record(recipe_id, kind, at, count))
+
+
+def forget(recipe_id):
+    _snapshot.update(lambda scores: scores.forget(recipe_id))
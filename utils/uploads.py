@@ -0,0 +1,105 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+from dotenv import load_dotenv
+
+from utils.cache import TTLCache
+from utils.images import preprocess
+from utils.metrics import record_upstream
+
+load_dotenv()
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "4"))
+UPLOAD_RETRY_DELAY = float(os.getenv("UPLOAD_RETRY_DELAY", "1.0"))
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+# content digest -> secure_url of images this process already uploaded
+_uploaded = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+_stats = {
+    "queued": 0,
+    "in_flight": 0,
+    "completed": 0,
+    "failed": 0,
+    "retries": 0,
+    "deduplicated": 0,
+    "upload_seconds_total": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def _bump(**changes):
+    with _stats_lock:
+        for name, delta in changes.items():
+            _stats[name] += delta
+
+
+def submit_upload(data, digest, folder, on_success, on_failure=None):
+    """Resize, re-encode and upload an image (see utils.images.read_upload) on a worker thread.
+
+    `on_success(secure_url)` runs on the worker once the upload finishes, so
+    it must not rely on the request context. Failed uploads are retried with
+    exponential backoff before `on_failure(error)` is called. Images are
+    stored under their content digest, so the same picture is only uploaded
+    once.
+    """
+    _bump(queued=1)
+    _executor.submit(_run, data, digest, folder, on_success, on_failure)
+
+
+def _run(data, digest, folder, on_success, on_failure):
+    _bump(queued=-1, in_flight=1)
+    try:
+        image_url = _uploaded.get(f"{folder}/{digest}")
+        if image_url:
+            _bump(deduplicated=1)
+            on_success(image_url)
+            return
+
+        data = preprocess(data)
+        for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                # overwrite=False makes Cloudinary hand back the existing asset
+                # when another process already stored this digest
+                result = cloudinary.uploader.upload(
+                    data, folder=folder, public_id=digest, overwrite=False, unique_filename=False
+                )
+            except Exception as e:
+                _bump(upload_seconds_total=time.perf_counter() - started)
+                record_upstream("cloudinary", folder, time.perf_counter() - started, failed=True)
+                if attempt == UPLOAD_MAX_ATTEMPTS:
+                    print(f"Upload to {folder} failed after {attempt} attempts:", e)
+                    _bump(failed=1)
+                    if on_failure:
+                        on_failure(e)
+                    return
+                _bump(retries=1)
+                time.sleep(UPLOAD_RETRY_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                continue
+
+            _bump(completed=1, upload_seconds_total=time.perf_counter() - started)
+            record_upstream("cloudinary", folder, time.perf_counter() - started)
+            _uploaded.set(f"{folder}/{digest}", result.get("secure_url"))
+            on_success(result.get("secure_url"))
+            return
+    except Exception as e:
+        print(f"Processing upload for {folder} failed:", e)
+        _bump(failed=1)
+        if on_failure:
+            on_failure(e)
+    finally:
+        _bump(in_flight=-1)
+
+
+def upload_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queue_depth"] = stats["queued"] + stats["in_flight"]
+    return stats
@@ -0,0 +1,37 @@
+import os
+
+from dotenv import load_dotenv
+
+from utils.cache import TTLCache
+
+load_dotenv()
+
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "60"))
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "10000"))
+
+_role_cache = TTLCache(maxsize=ROLE_CACHE_SIZE, ttl=ROLE_CACHE_TTL)
+
+
+def set_role_cache_backend(backend):
+    """Replace the per-process cache with a shared one exposing get/set/delete."""
+    global _role_cache
+    _role_cache = backend
+
+
+def _key(user_id):
+    return f"role:{user_id}"
+
+
+def is_admin(supabase, user_id):
+    cached = _role_cache.get(_key(user_id))
+    if cached is not None:
+        return cached
+
+    res = supabase.table("User").select("is_admin").eq("id", user_id).execute()
+    admin = bool(res.data and res.data[0]["is_admin"])
+    _role_cache.set(_key(user_id), admin)
+    return admin
+
+
+def invalidate_user(user_id):
+    _role_cache.delete(_key(user_id))